@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read-only HTTP/JSON API over the employee and product database.
+
+Runs without the Tk window, for POS terminals and reporting jobs:
+
+    python api_server.py [--host 127.0.0.1] [--port 8080] [--threads 32]
+
+Requests are served by a fixed pool of threads, each holding one read-only
+SQLite connection, so hundreds of concurrent readers share the WAL database
+with the desktop app. List endpoints are keyset-paginated, streamed as
+chunked JSON and carry an ETag derived from the change log, so unchanged
+pages cost a 304. Endpoints:
+
+    GET /api/employees?after=<id>&limit=<n>
+    GET /api/products?after=<id>&limit=<n>
+    GET /api/products/<id>
+    GET /api/products/<id>/image
+    GET /api/products/<id>/thumbnail
+    GET /api/categories
+    GET /api/search?q=<query>&limit=<n>
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 5000
+# Rows encoded per chunk of a streamed list response
+STREAM_ROWS = 500
+IMAGE_CHUNK = 64 * 1024
+# Images are content-addressed, so a hash never changes its bytes
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+LIST_CACHE_CONTROL = "no-cache"
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _image_type(head):
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def _int_param(params, name, default=None, minimum=0, maximum=None):
+    values = params.get(name)
+    if not values:
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+    if value < minimum:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise APIError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at most {maximum}")
+    return value
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the read functions in database.py"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "EmployeeProductAPI/1.0"
+    # Idle keep-alive connections give their pool thread back after this many seconds
+    timeout = 5
+
+    ROUTES = [
+        (re.compile(r"/api/employees"), "list_employees"),
+        (re.compile(r"/api/products"), "list_products"),
+        (re.compile(r"/api/products/(\d+)"), "get_product"),
+        (re.compile(r"/api/products/(\d+)/image"), "get_image"),
+        (re.compile(r"/api/products/(\d+)/thumbnail"), "get_thumbnail"),
+        (re.compile(r"/api/categories"), "list_categories"),
+        (re.compile(r"/api/search"), "search"),
+    ]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self.etag = None
+        self.params = parse_qs(url.query)
+        try:
+            for pattern, name in self.ROUTES:
+                match = pattern.fullmatch(url.path.rstrip("/"))
+                if match:
+                    getattr(self, name)(*match.groups())
+                    return
+            raise APIError(HTTPStatus.NOT_FOUND, "not found")
+        except APIError as e:
+            self.send_json({"error": str(e)}, e.status)
+        except sqlite3.Error as e:
+            self.log_error("database error: %s", e)
+            self.send_json({"error": "database error"}, HTTPStatus.SERVICE_UNAVAILABLE)
+
+    # --- Endpoints ---
+    def list_employees(self):
+        self.send_page(database.iter_employees)
+
+    def list_products(self):
+        self.send_page(database.iter_products)
+
+    def list_categories(self):
+        if self.not_modified("categories"):
+            return
+        self.send_rows(database.list_categories())
+
+    def search(self):
+        query = (self.params.get("q") or [""])[0].strip()
+        if not query:
+            raise APIError(HTTPStatus.BAD_REQUEST, "'q' is required")
+        limit = _int_param(self.params, "limit", database.SEARCH_LIMIT, 1, database.SEARCH_LIMIT)
+        if self.not_modified("search", query, limit):
+            return
+        self.send_rows(database.search_products(query, limit))
+
+    def get_product(self, product_id):
+        if self.not_modified("product", product_id):
+            return
+        rows = database.get_products([int(product_id)])
+        if not rows:
+            raise APIError(HTTPStatus.NOT_FOUND, "product not found")
+        self.send_json(rows[0]._asdict())
+
+    def get_image(self, product_id):
+        digest = self.image_hash(product_id)
+        if self.image_not_modified(digest):
+            return
+        with database.open_image(digest) as blob:
+            blob.seek(0, 2)
+            size = blob.tell()
+            blob.seek(0)
+            head = blob.read(IMAGE_CHUNK)
+            self.send_image_headers(_image_type(head), size, digest)
+            while head:
+                self.wfile.write(head)
+                head = blob.read(IMAGE_CHUNK)
+
+    def get_thumbnail(self, product_id):
+        digest = self.image_hash(product_id)
+        if self.image_not_modified(digest):
+            return
+        thumb = database.get_thumbnail(digest)
+        if thumb is None:
+            # Connections here are read-only: make it for this response without storing it
+            import thumbnails
+            with database.open_image(digest) as blob:
+                thumb = thumbnails.make_thumbnail(blob)
+        self.send_image_headers(_image_type(thumb[:12]), len(thumb), digest)
+        self.wfile.write(thumb)
+
+    # --- Helpers ---
+    def image_hash(self, product_id):
+        row = database.get_product_image_ref(int(product_id))
+        if row is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "product not found")
+        if row[1] is None:
+            raise APIError(HTTPStatus.NOT_FOUND, "product has no image")
+        return row[1]
+
+    def not_modified(self, *key):
+        """Set the list ETag for this request; answer 304 and return True if the client has it"""
+        # Any committed write bumps the change log, so its latest seq versions every response
+        key = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        self.etag = f'W/"{database.change_seq()}-{key}"'
+        if self.etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", self.etag)
+            self.send_header("Cache-Control", LIST_CACHE_CONTROL)
+            self.end_headers()
+            return True
+        return False
+
+    def image_not_modified(self, digest):
+        if f'"{digest}"' in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", f'"{digest}"')
+            self.send_header("Cache-Control", IMAGE_CACHE_CONTROL)
+            self.end_headers()
+            return True
+        return False
+
+    def send_image_headers(self, content_type, length, digest):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", f'"{digest}"')
+        self.send_header("Cache-Control", IMAGE_CACHE_CONTROL)
+        self.end_headers()
+
+    def send_json(self, body, status=HTTPStatus.OK):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if status == HTTPStatus.OK and self.etag:
+            self.send_header("ETag", self.etag)
+            self.send_header("Cache-Control", LIST_CACHE_CONTROL)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_page(self, read_page):
+        after = _int_param(self.params, "after")
+        limit = _int_param(self.params, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        if self.not_modified(read_page.__name__, after, limit):
+            return
+
+        def next_page(count, last):
+            return {"next_after": last[0] if count == limit else None}
+        self.send_rows(read_page(after, limit), next_page)
+
+    def send_rows(self, rows, extra=None):
+        """Stream {"items": [...], **extra(count, last row)} with chunked encoding.
+
+        `rows` may be a cursor: it is read STREAM_ROWS rows at a time, each
+        batch written before the next is read.
+        """
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("ETag", self.etag)
+        self.send_header("Cache-Control", LIST_CACHE_CONTROL)
+        self.end_headers()
+        self.write_chunk('{"items": [')
+        rows, count, last = iter(rows), 0, None
+        for batch in iter(lambda: list(itertools.islice(rows, STREAM_ROWS)), []):
+            items = (json.dumps(row._asdict(), ensure_ascii=False) for row in batch)
+            self.write_chunk(("," if count else "") + ",".join(items))
+            count, last = count + len(batch), batch[-1]
+        tail = "".join(f", {json.dumps(k)}: {json.dumps(v)}" for k, v in (extra(count, last) if extra else {}).items())
+        self.write_chunk(f"]{tail}}}")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, text):
+        data = text.encode("utf-8")
+        if data:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+
+    def end_headers(self):
+        # A kept-alive connection holds its pool thread; give it up while others are queued
+        if self.server.backlog:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands connections to a fixed thread pool.
+
+    Unlike ThreadingHTTPServer, threads are reused, so each keeps its
+    database connection open for the life of the server.
+    """
+
+    request_queue_size = 256
+
+    def __init__(self, address, handler, threads=32, verbose=False):
+        super().__init__(address, handler)
+        self.verbose = verbose
+        self.backlog = 0  # accepted connections still waiting for a thread
+        self._backlog_lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="api", initializer=self._init_thread)
+
+    @staticmethod
+    def _init_thread():
+        # The API never writes; refuse writes at the connection level too
+        database.get_connection().execute("PRAGMA query_only=ON")
+
+    def process_request(self, request, client_address):
+        with self._backlog_lock:
+            self.backlog += 1
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        with self._backlog_lock:
+            self.backlog -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        database.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the database as a read-only JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=32, help="request threads (one read connection each)")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    database.init_db()
+    server = PooledHTTPServer((args.host, args.port), APIHandler, args.threads, args.verbose)
+    print(f"Serving API on http://{args.host}:{args.port}/api/ ({args.threads} threads)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,33 @@
 # Required: pip install tk sqlite3 (built-in)
+import functools
+import time
+STARTED = time.perf_counter()  # startup timing begins before the heavy imports
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk, PhotoImage
 import sqlite3
 import os
-from PIL import Image, ImageTk
+import database
+from tree_sync import TreeviewReconciler, VirtualTable
+from live_search import LiveSearch
+from db_worker import DBWorker
+import instrumentation
+import thumbnails
+import image_pipeline
+import product_cache
+import query_cache
+import bulk_import
 import datetime
 
 # Database Setup
 def init_db():
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS employees (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        department TEXT NOT NULL
-    )
-    """)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS categories (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE
-    )
-    """)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        category TEXT NOT NULL,
-        price REAL NOT NULL,
-        quantity INTEGER NOT NULL,
-        image_blob BLOB
-    )
-    """)
-    conn.commit()
-    conn.close()
-    # إنشاء مجلد الصور إذا لم يكن موجودًا
-    if not os.path.exists("images"):
-        os.makedirs("images")
-
-def save_data():
-    """Ensure all data is properly saved to database"""
-    try:
-        conn = sqlite3.connect("employees.db")
-        conn.commit()
-        conn.close()
-        print("Data saved successfully!")
-    except Exception as e:
-        print(f"Error saving data: {e}")
+    database.init_db()
 
 # متغير لتخزين مسار الصورة المؤقت
 selected_image_path = None
 
 def choose_image():
     global selected_image_path
-    file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.gif")])
+    file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.gif;*.webp;*.bmp")])
     if file_path:
         selected_image_path = file_path
         image_label.config(text=os.path.basename(file_path))
@@ -64,107 +36,208 @@ def choose_image():
         image_label.config(text="No image selected")
 
 # Core Functions - Employees
+# All SQL and image decoding runs on db_worker; callbacks only touch widgets
+def show_error(title, message):
+    def on_error(error):
+        messagebox.showwarning(title, f"{message}: {error}")
+    return on_error
+
 def add_employee():
-    name = name_entry.get()
-    email = email_entry.get()
-    dept = dept_entry.get()
-    if not (name and email and dept):
-        messagebox.showwarning("Input error", "All fields are required.")
+    try:
+        name, email, dept = database.validate_employee(name_entry.get(), email_entry.get(), dept_entry.get())
+    except ValueError as e:
+        messagebox.showwarning("Input error", str(e))
         return
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("INSERT INTO employees (name, email, department) VALUES (?, ?, ?)", (name, email, dept))
-    conn.commit()
-    conn.close()
-    save_data()  # Ensure data is saved
-    show_employees()
-    clear_form()
+    def added(employee):
+        show_saved_rows("employees", [employee])
+        update_department_combobox()
+        clear_form()
+    def failed(error):
+        if isinstance(error, sqlite3.IntegrityError):
+            messagebox.showwarning("خطأ", "البريد الإلكتروني مستخدم بالفعل.")
+        else:
+            messagebox.showwarning("خطأ", f"فشل حفظ الموظف: {error}")
+    db_worker.submit(lambda: database.add_employee(name, email, dept), added, failed, busy=(add_btn,))
 
 def show_employees():
-    for row in employee_listbox.get_children():
-        employee_listbox.delete(row)
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM employees")
-    for row in cur.fetchall():
-        employee_listbox.insert("", tk.END, values=row)
-    conn.close()
+    state = table_state["employees"]
+    args = (state["filters"], state["sort"] or "id", state["descending"])
+    fetch = functools.partial(database.query_employees, *args)
+    employee_view.load(instrumentation.timed("show_employees", fetch), cursor=lambda row: row,
+                       fetch_before=reversed_pages(database.query_employees, *args))
+
+def reversed_pages(query, filters, sort, descending):
+    """The rows before a cursor in display order: a page of the opposite sort, turned around"""
+    return lambda before, limit: query(filters, sort, not descending, before, limit)[::-1]
 
 def delete_employee():
-    selected = employee_listbox.selection()
-    if not selected:
+    ids = selected_ids(employee_listbox)
+    if not ids or not confirm_delete(len(ids)):
         return
-    item = employee_listbox.item(selected[0])
-    emp_id = item['values'][0]
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("DELETE FROM employees WHERE id=?", (emp_id,))
-    conn.commit()
-    conn.close()
-    save_data()  # Ensure data is saved
-    show_employees()
+    db_worker.submit(lambda: database.delete_employees(ids), lambda _: employee_view.remove_many(ids),
+                     show_error("خطأ", "فشل الحذف"), busy=(delete_btn,))
 
 def clear_form():
     name_entry.delete(0, tk.END)
     email_entry.delete(0, tk.END)
-    dept_entry.delete(0, tk.END)
+    dept_entry.set("")
 
 # Core Functions - Products
 def add_product():
-    global selected_image_path
-    name = product_name_entry.get()
-    category = product_category_combobox.get()
     try:
-        price = float(product_price_entry.get())
-        quantity = int(product_quantity_entry.get())
-    except ValueError:
-        messagebox.showwarning("Input error", "Price and quantity must be numbers.")
-        return
-    if not (name and category):
-        messagebox.showwarning("Input error", "All fields are required.")
+        name, category, price, quantity = database.validate_product(
+            product_name_entry.get(), product_category_combobox.get(),
+            product_price_entry.get(), product_quantity_entry.get())
+    except ValueError as e:
+        messagebox.showwarning("Input error", str(e))
         return
-    image_blob = None
-    if selected_image_path:
-        try:
-            with open(selected_image_path, 'rb') as f:
-                image_blob = f.read()
-        except Exception as e:
-            messagebox.showwarning("Image error", f"فشل قراءة الصورة: {e}")
-            image_blob = None
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("INSERT INTO products (name, category, price, quantity, image_blob) VALUES (?, ?, ?, ?, ?)", (name, category, price, quantity, image_blob))
-    conn.commit()
-    conn.close()
-    save_data()  # Ensure data is saved
-    show_products()
-    clear_product_form()
-    image_label.config(text="No image selected")
-    selected_image_path = None
+    image_path = selected_image_path
+
+    def save():
+        # Runs on the worker: orient, downscale and recompress the photo, then store product and image together
+        image, image_error = None, None
+        if image_path:
+            try:
+                image = image_pipeline.ingest(image_path)
+            except Exception as e:
+                image_error = e
+        product = database.add_product(name, category, price, quantity, image)
+        return product, image_error
+
+    def added(result):
+        global selected_image_path
+        product, image_error = result
+        if image_error:
+            messagebox.showwarning("Image error", f"فشل قراءة الصورة: {image_error}")
+        show_saved_rows("products", [product])
+        show_dashboard()
+        show_product_count()
+        clear_product_form()
+        image_label.config(text="No image selected")
+        selected_image_path = None
+
+    def failed(error):
+        if isinstance(error, (database.ImageTooLargeError, OSError)):
+            messagebox.showwarning("Image error", f"فشل حفظ الصورة: {error}")
+        else:
+            messagebox.showwarning("Input error", str(error))
+    db_worker.submit(save, added, failed, busy=(add_product_btn, image_btn))
 
 def show_products():
-    for row in product_listbox.get_children():
-        product_listbox.delete(row)
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, category, price, quantity FROM products")
-    for row in cur.fetchall():
-        product_listbox.insert("", tk.END, values=row)
-    conn.close()
+    state = table_state["products"]
+    args = (state["filters"], state["sort"] or "id", state["descending"])
+    if catalog_cache.loaded:
+        def fetch(after, limit):
+            # Sorted and filtered pages come from memory once the cache is loaded
+            catalog_cache.sync()
+            return catalog_cache.query(*args, after, limit)
+        fetch_before = reversed_pages(catalog_cache.query, *args)
+    else:
+        fetch = functools.partial(database.query_products, *args)
+        fetch_before = reversed_pages(database.query_products, *args)
+    product_view.load(instrumentation.timed("show_products", fetch), cursor=lambda row: row,
+                      fetch_before=fetch_before)
+    show_product_count()
+
+def show_product_count():
+    """Number of products matching the filters, in the table's title"""
+    if not catalog_cache.loaded:
+        return
+    filters = table_state["products"]["filters"]
+    def count():
+        catalog_cache.sync()
+        return catalog_cache.count(filters)
+    db_worker.submit(count, lambda n: product_table_frame.config(text=f"قائمة المنتجات ({n:,})"))
 
 def delete_product():
-    selected = product_listbox.selection()
-    if not selected:
+    ids = selected_ids(product_listbox)
+    if not ids or not confirm_delete(len(ids)):
         return
-    item = product_listbox.item(selected[0])
-    product_id = item['values'][0]
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("DELETE FROM products WHERE id=?", (product_id,))
-    conn.commit()
-    conn.close()
-    save_data()  # Ensure data is saved
-    show_products()
+    def deleted(_):
+        product_view.remove_many(ids)
+        show_dashboard()
+        show_product_count()
+    db_worker.submit(lambda: database.delete_products(ids), deleted,
+                     show_error("خطأ", "فشل الحذف"), busy=(delete_product_btn,))
+
+# --- Multi-select helpers and bulk edit ---
+def selected_ids(tree):
+    """Row ids of every selected item (Treeview items are keyed by row id)"""
+    return [int(item) for item in tree.selection()]
+
+def confirm_delete(count):
+    return count == 1 or messagebox.askyesno("تأكيد الحذف", f"حذف {count} عنصر محدد؟")
+
+def bulk_edit(kind):
+    """Set one field on every selected employee or product, in one transaction"""
+    if kind == "employees":
+        tree, fields, update = employee_listbox, database.EMPLOYEE_EDIT_FIELDS, database.update_employees
+    else:
+        tree, fields, update = product_listbox, database.PRODUCT_EDIT_FIELDS, database.update_products
+    ids = selected_ids(tree)
+    if not ids:
+        messagebox.showinfo("تعديل", "يرجى تحديد صف واحد على الأقل.")
+        return
+
+    dialog = tk.Toplevel(root)
+    dialog.title(f"تعديل {len(ids)} عنصر")
+    dialog.configure(bg="#f5f7fa", padx=15, pady=15)
+    dialog.transient(root)
+    tk.Label(dialog, text="الحقل", font=("Arial", 12), bg="#f5f7fa").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    field_combobox = ttk.Combobox(dialog, values=list(fields), state="readonly", font=("Arial", 11))
+    field_combobox.current(0)
+    field_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+    tk.Label(dialog, text="القيمة الجديدة", font=("Arial", 12), bg="#f5f7fa").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    value_combobox = ttk.Combobox(dialog, font=("Arial", 11))
+    value_combobox.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    def on_field_selected(event=None):
+        suggestions = {"category": database.category_names, "department": database.department_names}.get(field_combobox.get())
+        value_combobox['values'] = ()
+        def set_values(names):
+            if value_combobox.winfo_exists():
+                value_combobox['values'] = names
+        if suggestions:
+            db_worker.submit(suggestions, set_values)
+    field_combobox.bind("<<ComboboxSelected>>", on_field_selected)
+    on_field_selected()
+
+    def apply_edit():
+        field, value = field_combobox.get(), value_combobox.get()
+        def updated(rows):
+            show_saved_rows(kind, rows)
+            if kind == "products":
+                show_dashboard()
+                show_product_count()
+            dialog.destroy()
+        def failed(error):
+            # Unknown categories and non-numeric values are rejected by the database layer
+            messagebox.showwarning("Input error", str(error), parent=dialog)
+        db_worker.submit(lambda: update(ids, field, value), updated, failed, busy=(apply_btn,))
+
+    apply_btn = tk.Button(dialog, text="تطبيق", command=apply_edit, font=("Arial", 11, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    apply_btn.grid(row=2, column=0, columnspan=2, pady=10, ipadx=20, sticky="ew")
+
+# --- Bulk Import ---
+def import_records(kind):
+    """Import employees or products from a CSV, JSON Lines or JSON array file"""
+    path = filedialog.askopenfilename(filetypes=[("CSV / JSON", "*.csv;*.jsonl;*.ndjson;*.json")])
+    if not path:
+        return
+    def imported(report):
+        if kind == "employees":
+            employee_view.refresh()
+            update_department_combobox()
+        else:
+            product_view.refresh()
+            show_categories()
+            update_category_combobox()
+            show_dashboard()
+            show_product_count()
+        messagebox.showinfo("استيراد", report.summary())
+    button = import_employees_btn if kind == "employees" else import_products_btn
+    db_worker.submit(lambda: bulk_import.import_file(kind, path), imported,
+                     show_error("استيراد", "فشل الاستيراد"), busy=(button,))
 
 def clear_product_form():
     product_name_entry.delete(0, tk.END)
@@ -174,16 +247,107 @@ def clear_product_form():
 
 # --- Product Search ---
 def search_products():
-    query = search_entry.get().strip().lower()
-    for row in product_listbox.get_children():
-        product_listbox.delete(row)
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, category, price, quantity FROM products")
-    for row in cur.fetchall():
-        if (query in str(row[1]).lower() or query in str(row[2]).lower() or query in str(row[3]).lower() or query in str(row[4]).lower()):
-            product_listbox.insert("", tk.END, values=row)
-    conn.close()
+    """Search immediately (search button / Enter)"""
+    query = search_entry.get().strip()
+    if not query:
+        live_search.cancel()
+        show_products()
+        return
+    live_search.submit(query)
+
+def on_search_changed(*args):
+    """Search as the user types, once typing pauses"""
+    query = search_entry.get().strip()
+    if not query:
+        live_search.cancel()
+        show_products()
+        return
+    live_search.schedule(query)
+
+@instrumentation.timed("search_products")
+def run_search(query):
+    # Runs on the live-search worker thread
+    state = table_state["products"]
+    filters, sort, descending = state["filters"], state["sort"], state["descending"]
+    def search():
+        rows = database.search_products(query, database.SEARCH_LIMIT, filters, sort, descending)
+        if not rows and catalog_cache.loaded:
+            # The prefix index found nothing: try the text anywhere in a name or category.
+            # No sync here: a newer keystroke interrupts this thread's connection, and the
+            # db worker already syncs the cache whenever the products change.
+            rows = catalog_cache.search(query, database.SEARCH_LIMIT, filters)
+        return rows
+    return search, search()
+
+def show_search_results(result):
+    search, rows = result
+    first_page = [rows]
+    def fetch(after, limit):
+        # Ranked results come back as a single bounded page; refreshes re-run the query
+        if after is not None:
+            return []
+        return first_page.pop() if first_page else search()
+    product_view.load(fetch)
+
+# --- Sorting and facet filters ---
+# Per table: the sort column (None: by id, or by rank while searching),
+# its direction and the facet filters, all applied by the SQL query
+table_state = {
+    "employees": {"sort": None, "descending": False, "filters": {}},
+    "products": {"sort": None, "descending": False, "filters": {}},
+}
+SORT_COLUMNS = {
+    "ID": "id", "Name": "name", "Email": "email", "Department": "department",
+    "Category": "category", "Price": "price", "Quantity": "quantity",
+}
+
+def sort_table(kind, column):
+    """Heading click: sort by the column, or reverse the order if already sorted by it"""
+    state = table_state[kind]
+    sort = SORT_COLUMNS[column]
+    state["descending"] = not state["descending"] if state["sort"] == sort else False
+    state["sort"] = sort
+    tree = employee_listbox if kind == "employees" else product_listbox
+    arrow = " ▼" if state["descending"] else " ▲"
+    for col in tree["columns"]:
+        tree.heading(col, text=col + (arrow if col == column else ""))
+    if kind == "employees":
+        show_employees()
+    else:
+        search_products()
+
+def apply_filters(kind, event=None):
+    """Read the filter bar of a table and reload it with the new facets"""
+    filters = {name: widget.get().strip() for name, widget in filter_widgets[kind].items()}
+    facets = database.EMPLOYEE_FACETS if kind == "employees" else database.PRODUCT_FACETS
+    try:
+        database.compile_filters(facets, filters)
+    except ValueError as e:
+        messagebox.showwarning("Input error", str(e))
+        return
+    table_state[kind]["filters"] = filters
+    if kind == "employees":
+        show_employees()
+    else:
+        search_products()
+
+def clear_filters(kind):
+    for widget in filter_widgets[kind].values():
+        if isinstance(widget, ttk.Combobox):
+            widget.set("")
+        else:
+            widget.delete(0, tk.END)
+    apply_filters(kind)
+
+def show_saved_rows(kind, rows):
+    """Show added or edited rows in place when the table is in id order, else re-query it"""
+    view = employee_view if kind == "employees" else product_view
+    state = table_state[kind]
+    if state["sort"] in (None, "id") and not state["descending"] and not any(state["filters"].values()):
+        for row in rows:
+            view.upsert(row)
+    else:
+        view.refresh()
 
 # --- Category Management ---
 def add_category():
@@ -191,64 +355,73 @@ def add_category():
     if not name:
         messagebox.showwarning("خطأ", "يرجى إدخال اسم الفئة.")
         return
-    try:
-        conn = sqlite3.connect("employees.db")
-        cur = conn.cursor()
-        cur.execute("INSERT INTO categories (name) VALUES (?)", (name,))
-        conn.commit()
-        conn.close()
-        save_data()  # Ensure data is saved
-        show_categories()
+    def added(category):
+        category_view.upsert(category)
         update_category_combobox()
+        show_dashboard()
         category_name_entry.delete(0, tk.END)
-    except sqlite3.IntegrityError:
-        messagebox.showwarning("خطأ", "اسم الفئة موجود بالفعل.")
+    def failed(error):
+        if isinstance(error, sqlite3.IntegrityError):
+            messagebox.showwarning("خطأ", "اسم الفئة موجود بالفعل.")
+        else:
+            messagebox.showwarning("خطأ", f"فشل حفظ الفئة: {error}")
+    db_worker.submit(lambda: database.add_category(name), added, failed, busy=(add_category_btn,))
 
 def show_categories():
-    for row in category_listbox.get_children():
-        category_listbox.delete(row)
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM categories")
-    for row in cur.fetchall():
-        category_listbox.insert("", tk.END, values=row)
-    conn.close()
+    db_worker.submit(database.list_categories, category_view.reconcile)
 
 def delete_category():
-    selected = category_listbox.selection()
-    if not selected:
+    ids = selected_ids(category_listbox)
+    if not ids or not confirm_delete(len(ids)):
         return
-    item = category_listbox.item(selected[0])
-    cat_id = item['values'][0]
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("DELETE FROM categories WHERE id=?", (cat_id,))
-    conn.commit()
-    conn.close()
-    save_data()  # Ensure data is saved
-    show_categories()
-    update_category_combobox()
+    def deleted(_):
+        category_view.remove_many(ids)
+        update_category_combobox()
+        show_dashboard()
+    def failed(error):
+        if isinstance(error, sqlite3.IntegrityError):
+            messagebox.showwarning("خطأ", "لا يمكن حذف فئة تحتوي على منتجات.")
+        else:
+            messagebox.showwarning("خطأ", f"فشل الحذف: {error}")
+    db_worker.submit(lambda: database.delete_categories(ids), deleted, failed, busy=(delete_category_btn,))
 
 def update_category_combobox():
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM categories")
-    categories = [row[0] for row in cur.fetchall()]
-    conn.close()
-    product_category_combobox['values'] = categories
-    if categories:
-        product_category_combobox.current(0)
-    else:
-        product_category_combobox.set("")
-
-# GUI Setup
-init_db()
-root = tk.Tk()
-root.title("Employee & Product Management System")
-root.geometry("1200x800")
-root.configure(bg="#eaf0fa")  # خلفية هادئة
-
-# Center the window on screen
+    def apply(categories):
+        current = product_category_combobox.get()
+        product_category_combobox['values'] = categories
+        if current in categories:
+            product_category_combobox.set(current)
+        elif categories:
+            product_category_combobox.current(0)
+        else:
+            product_category_combobox.set("")
+        filter_widgets["products"]["category"]['values'] = [""] + categories
+    # Same query as show_categories, so the second of the two is a cache hit
+    db_worker.submit(lambda: [category.name for category in database.list_categories()], apply)
+
+def update_department_combobox():
+    def apply(names):
+        dept_entry.configure(values=names)
+        filter_widgets["employees"]["department"].configure(values=[""] + names)
+    db_worker.submit(database.department_names, apply)
+
+# --- Inventory dashboard ---
+def show_dashboard():
+    """Per-category stock figures, read from the trigger-maintained summary"""
+    def apply(rows):
+        dashboard_view.reconcile([
+            (row.category_id, row.category, row.product_count, row.total_quantity,
+             f"{row.stock_value:,.2f}", row.low_stock)
+            for row in rows
+        ])
+        dashboard_totals.config(text=(
+            f"المنتجات: {sum(r.product_count for r in rows)}    "
+            f"الكمية: {sum(r.total_quantity for r in rows)}    "
+            f"قيمة المخزون: {sum(r.stock_value for r in rows):,.2f}    "
+            f"مخزون منخفض: {sum(r.low_stock for r in rows)}"))
+    db_worker.submit(database.inventory_summary, apply)
+
+# --- Window helpers ---
 def center_window():
     """Center the window on the screen"""
     root.update_idletasks()
@@ -258,179 +431,8 @@ def center_window():
     y = (root.winfo_screenheight() // 2) - (height // 2)
     root.geometry(f"{width}x{height}+{x}+{y}")
 
-# Create main container for centering
-main_container = tk.Frame(root, bg="#eaf0fa")
-main_container.pack(expand=True, fill="both", padx=20, pady=20)
-
-# Create canvas for scrolling
-main_canvas = tk.Canvas(main_container, bg="#eaf0fa", highlightthickness=0)
-main_canvas.pack(side="left", fill="both", expand=True)
-main_scrollbar = tk.Scrollbar(main_container, orient="vertical", command=main_canvas.yview)
-main_scrollbar.pack(side="right", fill="y")
-main_canvas.configure(yscrollcommand=main_scrollbar.set)
-
-# Create content frame with proper centering
-content_frame = tk.Frame(main_canvas, bg="#eaf0fa")
-main_canvas.create_window((0, 0), window=content_frame, anchor="nw")
-
 def on_configure(event):
     main_canvas.configure(scrollregion=main_canvas.bbox("all"))
-content_frame.bind("<Configure>", on_configure)
-
-# Configure grid weights for centering
-content_frame.grid_columnconfigure(0, weight=1)
-content_frame.grid_columnconfigure(1, weight=1)
-content_frame.grid_columnconfigure(2, weight=1)
-content_frame.grid_columnconfigure(3, weight=1)
-
-# Header section - centered
-header_frame = tk.Frame(content_frame, bg="#eaf0fa")
-header_frame.grid(row=0, column=0, columnspan=4, pady=(0, 20), sticky="ew")
-
-try:
-    logo_img = Image.open("logo.png")
-    logo_img = logo_img.resize((60, 60))
-    logo_tk = ImageTk.PhotoImage(logo_img)
-    logo_label = tk.Label(header_frame, image=logo_tk, bg="#eaf0fa")
-    logo_label.image = logo_tk
-    logo_label.pack(side="left", padx=(0, 10))
-except Exception:
-    logo_label = tk.Label(header_frame, text="🛰️", font=("Arial", 36), bg="#eaf0fa")
-    logo_label.pack(side="left", padx=(0, 10))
-
-main_title = tk.Label(header_frame, text="Employee & Product Management System", font=("Arial", 28, "bold"), fg="#d32f2f", bg="#eaf0fa")
-main_title.pack(side="left")
-
-# Employee Form - centered
-emp_frame = tk.LabelFrame(content_frame, text="إضافة موظف", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
-emp_frame.grid(row=1, column=0, columnspan=2, padx=(0, 10), pady=10, sticky="nsew")
-
-emp_label_style = {"font": ("Arial", 12), "bg": "#f5f7fa"}
-emp_entry_style = {"font": ("Arial", 12), "bd": 1, "relief": "solid", "bg": "#fff"}
-
-name_label = tk.Label(emp_frame, text="Employee Name", **emp_label_style)
-name_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
-name_entry = tk.Entry(emp_frame, **emp_entry_style)
-name_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-email_label = tk.Label(emp_frame, text="Email", **emp_label_style)
-email_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
-email_entry = tk.Entry(emp_frame, **emp_entry_style)
-email_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-dept_label = tk.Label(emp_frame, text="Department", **emp_label_style)
-dept_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
-dept_entry = tk.Entry(emp_frame, **emp_entry_style)
-dept_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-
-# Configure employee frame grid weights
-emp_frame.grid_columnconfigure(1, weight=1)
-
-add_btn = tk.Button(emp_frame, text="Add Employee", command=add_employee, font=("Arial", 12, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-add_btn.grid(row=3, column=0, columnspan=2, pady=15, ipadx=20, sticky="ew")
-
-# Employee Table - centered
-employee_table_frame = tk.LabelFrame(content_frame, text="قائمة الموظفين", font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
-employee_table_frame.grid(row=2, column=0, columnspan=2, padx=(0, 10), pady=10, sticky="nsew")
-
-employee_columns = ("ID", "Name", "Email", "Department")
-employee_listbox = ttk.Treeview(employee_table_frame, columns=employee_columns, show='headings', height=7)
-for col in employee_columns:
-    employee_listbox.heading(col, text=col)
-    employee_listbox.column(col, width=110)
-employee_listbox.grid(row=0, column=0, pady=5, padx=5, sticky="nsew")
-
-# Scrollbar for employee table
-employee_scrollbar = tk.Scrollbar(employee_table_frame, orient="vertical", command=employee_listbox.yview)
-employee_listbox.configure(yscrollcommand=employee_scrollbar.set)
-employee_scrollbar.grid(row=0, column=1, sticky="ns")
-
-# Configure employee table frame grid weights
-employee_table_frame.grid_columnconfigure(0, weight=1)
-employee_table_frame.grid_rowconfigure(0, weight=1)
-
-style = ttk.Style()
-style.configure("Treeview", font=("Arial", 11), rowheight=28, background="#fff", fieldbackground="#fff")
-style.configure("Treeview.Heading", font=("Arial", 12, "bold"), background="#1976d2", foreground="#000")
-
-# Employee Delete Button
-delete_btn = tk.Button(employee_table_frame, text="Delete Employee", command=delete_employee, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-delete_btn.grid(row=1, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
-
-# Product Form - centered
-prod_frame = tk.LabelFrame(content_frame, text="إضافة منتج", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
-prod_frame.grid(row=1, column=2, columnspan=2, padx=(10, 0), pady=10, sticky="nsew")
-
-prod_label_style = {"font": ("Arial", 12), "bg": "#f5f7fa"}
-prod_entry_style = {"font": ("Arial", 12), "bd": 1, "relief": "solid", "bg": "#fff"}
-
-product_name_label = tk.Label(prod_frame, text="Product Name", **prod_label_style)
-product_name_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
-product_name_entry = tk.Entry(prod_frame, **prod_entry_style)
-product_name_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-
-product_category_label = tk.Label(prod_frame, text="Category", **prod_label_style)
-product_category_label.grid(row=0, column=2, padx=5, pady=5, sticky="w")
-product_category_combobox = ttk.Combobox(prod_frame, state="readonly", font=("Arial", 11))
-product_category_combobox.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
-
-product_price_label = tk.Label(prod_frame, text="Price", **prod_label_style)
-product_price_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
-product_price_entry = tk.Entry(prod_frame, **prod_entry_style)
-product_price_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-
-product_quantity_label = tk.Label(prod_frame, text="الكمية", **prod_label_style)
-product_quantity_label.grid(row=1, column=2, padx=5, pady=5, sticky="w")
-product_quantity_entry = tk.Entry(prod_frame, **prod_entry_style)
-product_quantity_entry.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
-
-image_btn = tk.Button(prod_frame, text="اختيار صورة", command=choose_image, font=("Arial", 11), bg="#1976d2", fg="#fff", activebackground="#1565c0", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-image_btn.grid(row=2, column=0, pady=5, ipadx=10, sticky="w")
-image_label = tk.Label(prod_frame, text="No image selected", font=("Arial", 10), bg="#f5f7fa")
-image_label.grid(row=2, column=1, pady=5, sticky="w")
-
-# Configure product frame grid weights
-prod_frame.grid_columnconfigure(1, weight=1)
-prod_frame.grid_columnconfigure(3, weight=1)
-
-add_product_btn = tk.Button(prod_frame, text="Add Product", command=add_product, font=("Arial", 12, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-add_product_btn.grid(row=3, column=0, columnspan=4, pady=15, ipadx=20, sticky="ew")
-
-# Product Table - centered
-product_table_frame = tk.LabelFrame(content_frame, text="قائمة المنتجات", font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
-product_table_frame.grid(row=2, column=2, columnspan=2, padx=(10, 0), pady=10, sticky="nsew")
-
-# Search section
-search_frame = tk.Frame(product_table_frame, bg="#f5f7fa")
-search_frame.grid(row=0, column=0, columnspan=2, pady=5, sticky="ew")
-
-search_entry = tk.Entry(search_frame, font=("Arial", 12), width=18)
-search_entry.pack(side="left", padx=(5, 5))
-search_btn = tk.Button(search_frame, text="بحث", command=search_products, font=("Arial", 11, "bold"), bg="#1976d2", fg="#fff", bd=0, relief="ridge", cursor="hand2")
-search_btn.pack(side="left", padx=(0, 5))
-
-product_columns = ("ID", "Name", "Category", "Price", "Quantity")
-product_listbox = ttk.Treeview(product_table_frame, columns=product_columns, show='headings', height=7)
-for col in product_columns:
-    product_listbox.heading(col, text=col)
-    product_listbox.column(col, width=110)
-product_listbox.grid(row=1, column=0, pady=5, padx=5, sticky="nsew")
-
-# Scrollbar for product table
-product_scrollbar = tk.Scrollbar(product_table_frame, orient="vertical", command=product_listbox.yview)
-product_listbox.configure(yscrollcommand=product_scrollbar.set)
-product_scrollbar.grid(row=1, column=1, sticky="ns")
-
-# Configure product table frame grid weights
-product_table_frame.grid_columnconfigure(0, weight=1)
-product_table_frame.grid_rowconfigure(1, weight=1)
-
-# Product Delete Button
-delete_product_btn = tk.Button(product_table_frame, text="Delete Product", command=delete_product, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-delete_product_btn.grid(row=2, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
-
-# عند تحديد منتج، عرض صورته
-product_image_panel = None
 
 def on_product_select(event):
     selected = product_listbox.selection()
@@ -440,117 +442,529 @@ def on_product_select(event):
     product_id = item['values'][0]
     show_product_image_popup(product_id)
 
+# --- Product image popup ---
 def show_product_image_popup(product_id):
-    conn = sqlite3.connect("employees.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name, image_blob FROM products WHERE id=?", (product_id,))
-    row = cur.fetchone()
-    conn.close()
-    if row and row[1]:
+    db_worker.submit(lambda: database.get_product_image_ref(product_id), show_image_ref)
+
+def show_image_ref(row):
+    if not (row and row[1]):
+        messagebox.showinfo("لا توجد صورة", "لا توجد صورة محفوظة لهذا المنتج.")
+        return
+    name, digest = row
+    img_tk = photo_cache.get(digest)
+    if img_tk is not None:
+        open_image_popup(name, img_tk)
+        return
+    @instrumentation.timed("image_popup_decode")
+    def decode():
+        # Runs on the worker; only the PhotoImage must be created on the Tk thread
         import io
-        img = Image.open(io.BytesIO(row[1]))
-        img = img.resize((300, 300))
+        from PIL import Image
+        thumb = database.get_thumbnail(digest)
+        if thumb is None:
+            # Stored before thumbnails existed; create it once and keep it
+            with database.open_image(digest) as blob:
+                thumb = thumbnails.make_thumbnail(blob)
+            database.set_thumbnail(digest, thumb)
+        img = Image.open(io.BytesIO(thumb))
+        img.load()
+        return img
+    def decoded(img):
+        from PIL import ImageTk
         img_tk = ImageTk.PhotoImage(img)
-        popup = tk.Toplevel(root)
-        popup.title(f"صورة المنتج: {row[0]}")
-        popup.geometry("340x360")
-        popup.configure(bg="#eaf0fa")
-        label = tk.Label(popup, text=row[0], font=("Arial", 14, "bold"), bg="#eaf0fa")
-        label.pack(pady=10)
-        img_label = tk.Label(popup, image=img_tk, bg="#eaf0fa")
-        img_label.img_tk = img_tk
-        img_label.pack(pady=10)
-    else:
-        messagebox.showinfo("لا توجد صورة", "لا توجد صورة محفوظة لهذا المنتج.")
-
-# --- Category UI ---
-category_frame = tk.LabelFrame(content_frame, text="إدارة الفئات", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
-category_frame.grid(row=3, column=0, columnspan=4, pady=20, sticky="ew")
-
-# Category input section
-category_input_frame = tk.Frame(category_frame, bg="#f5f7fa")
-category_input_frame.grid(row=0, column=0, columnspan=2, pady=(0, 10), sticky="ew")
-
-category_name_entry = tk.Entry(category_input_frame, font=("Arial", 12), bd=1, relief="solid", bg="#fff")
-category_name_entry.pack(side="left", padx=(0, 10), fill="x", expand=True)
-
-add_category_btn = tk.Button(category_input_frame, text="إضافة فئة", command=add_category, font=("Arial", 11, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-add_category_btn.pack(side="left", padx=(0, 10))
-
-# Configure category input frame
-category_input_frame.grid_columnconfigure(0, weight=1)
-
-category_listbox = ttk.Treeview(category_frame, columns=("ID", "Name"), show='headings', height=4)
-category_listbox.heading("ID", text="ID")
-category_listbox.heading("Name", text="اسم الفئة")
-category_listbox.column("ID", width=40)
-category_listbox.column("Name", width=200)
-category_listbox.grid(row=1, column=0, pady=5, padx=5, sticky="nsew")
-
-# Scrollbar for category table
-category_scrollbar = tk.Scrollbar(category_frame, orient="vertical", command=category_listbox.yview)
-category_listbox.configure(yscrollcommand=category_scrollbar.set)
-category_scrollbar.grid(row=1, column=1, sticky="ns")
+        photo_cache.put(digest, img_tk)
+        open_image_popup(name, img_tk)
+    db_worker.submit(decode, decoded, show_error("Image error", "فشل قراءة الصورة"))
+
+def open_image_popup(name, img_tk):
+    popup = tk.Toplevel(root)
+    popup.title(f"صورة المنتج: {name}")
+    popup.geometry("340x360")
+    popup.configure(bg="#eaf0fa")
+    label = tk.Label(popup, text=name, font=("Arial", 14, "bold"), bg="#eaf0fa")
+    label.pack(pady=10)
+    img_label = tk.Label(popup, image=img_tk, bg="#eaf0fa")
+    img_label.img_tk = img_tk
+    img_label.pack(pady=10)
 
-# Configure category frame grid weights
-category_frame.grid_columnconfigure(0, weight=1)
-category_frame.grid_rowconfigure(1, weight=1)
-
-delete_category_btn = tk.Button(category_frame, text="حذف الفئة", command=delete_category, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
-delete_category_btn.grid(row=2, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
-
-# بعد تعريف main_canvas:
 def _on_mousewheel(event):
     if event.keysym == 'Down':
         main_canvas.yview_scroll(1, 'units')
     elif event.keysym == 'Up':
         main_canvas.yview_scroll(-1, 'units')
 
-main_canvas.bind_all('<Down>', _on_mousewheel)
-main_canvas.bind_all('<Up>', _on_mousewheel)
-
-# اربط النقر المزدوج:
-product_listbox.bind("<Double-1>", on_product_select)
+def show_diagnostics(event=None):
+    global diagnostics_window
+    if diagnostics_window is not None and diagnostics_window.window.winfo_exists():
+        diagnostics_window.window.lift()
+        return
+    diagnostics_window = instrumentation.DiagnosticsWindow(root)
 
-# Handle window close event to ensure data is saved
 def on_closing():
     """Handle application closing"""
     try:
-        save_data()
+        live_search.cancel()
+        db_worker.stop()
+        database.close_all()
+        print(f"Query cache: {read_cache.summary()}")
+        print(f"Performance stats saved to {instrumentation.dump()}")
         print("Application closing - data saved successfully!")
     except Exception as e:
         print(f"Error saving data on close: {e}")
     finally:
         root.destroy()
 
-root.protocol("WM_DELETE_WINDOW", on_closing)
-
-# Load initial data BEFORE starting the mainloop
-print("Loading saved data...")
-show_categories()
-update_category_combobox()
-show_employees()
-show_products()
-print("Data loaded successfully!")
-
-# Center the window
-center_window()
-
-# Add automatic data refresh every 30 seconds to ensure data stays current
-def auto_refresh_data():
-    """Automatically refresh data every 30 seconds"""
-    try:
+# --- Startup and auto-refresh ---
+REFRESH_INTERVAL_MS = 1000
+# Trim the change log once a minute while the window is open
+PRUNE_EVERY_POLLS = 60
+polls = 0
+# Set once the database is open (see load_initial_data)
+change_watcher = None
+# Column-oriented copy of the products, loaded after the tables are filled
+catalog_cache = product_cache.ProductCache()
+# Recent results of the small repeated reads, dropped when their tables are written
+read_cache = query_cache.QueryCache()
+diagnostics_window = None
+
+def on_first_map(event):
+    if event.widget is not root:
+        return
+    root.unbind("<Map>")
+    instrumentation.mark_startup("first frame")
+    root.after_idle(load_initial_data)
+
+def open_database():
+    # Runs on the worker: migrations first, then a change watcher on the worker's connection
+    init_db()
+    return database.ChangeWatcher()
+
+def load_initial_data():
+    """Open the database and fill the views, after the window is already on screen"""
+    print("Loading saved data...")
+    def ready(watcher):
+        global change_watcher
+        change_watcher = watcher
+        instrumentation.mark_startup("database ready")
         show_categories()
         update_category_combobox()
+        update_department_combobox()
         show_employees()
         show_products()
-    except Exception as e:
-        print(f"Auto-refresh error: {e}")
-    finally:
-        # Schedule next refresh in 30 seconds
-        root.after(30000, auto_refresh_data)
+        show_dashboard()
+        # Jobs run in order, so this one finishes after every load above
+        db_worker.submit(lambda: None, data_loaded)
+    def failed(error):
+        messagebox.showerror("Database error", f"فشل فتح قاعدة البيانات: {error}")
+    db_worker.submit(open_database, ready, failed)
+
+def data_loaded(_):
+    instrumentation.mark_startup("data loaded")
+    print("Data loaded successfully!")
+    print(instrumentation.startup_summary())
+    load_logo()
+    load_product_cache()
+    root.after(REFRESH_INTERVAL_MS, auto_refresh_data)
+
+def load_product_cache():
+    def loaded(rows):
+        print(f"Product cache: {rows} rows, {catalog_cache.memory_bytes() / 1048576:.1f} MB")
+        show_product_count()
+    db_worker.submit(catalog_cache.load, loaded, lambda error: print(f"Product cache error: {error}"))
+
+def load_logo():
+    """Swap the header placeholder for logo.png; PIL is only imported here"""
+    def decode():
+        from PIL import Image
+        return Image.open("logo.png").resize((60, 60))
+    def show(img):
+        from PIL import ImageTk
+        logo_tk = ImageTk.PhotoImage(img)
+        logo_label.configure(image=logo_tk, text="")
+        logo_label.image = logo_tk
+    # No logo.png (or no Pillow): keep the placeholder
+    db_worker.submit(decode, show, lambda error: None)
+
+def auto_refresh_data():
+    """Poll for database changes every second and reload only what changed"""
+    def changed(tables):
+        for table in tables:
+            for handler in refresh_handlers.get(table, ()):
+                handler()
+        root.after(REFRESH_INTERVAL_MS, auto_refresh_data)
+    def failed(error):
+        print(f"Auto-refresh error: {error}")
+        root.after(REFRESH_INTERVAL_MS, auto_refresh_data)
+    def poll():
+        global polls
+        tables = change_watcher.poll() if change_watcher else set()
+        # Written by another process: drop the cached reads before the views re-read them
+        read_cache.invalidate(*tables)
+        polls += 1
+        if change_watcher and polls % PRUNE_EVERY_POLLS == 0:
+            # Keep the changes the watcher and the product cache have not read yet
+            seen = change_watcher.seq
+            if catalog_cache.loaded:
+                seen = min(seen, catalog_cache.seq)
+            database.prune_change_log(before=seen)
+        return tables
+    # The next poll is scheduled only once this one is back, so polls never pile up
+    db_worker.submit(instrumentation.timed("auto_refresh", poll), changed, failed)
+
+# GUI Setup
+def main():
+    """Build and show the window; the database is opened and read after the first frame"""
+    # Widgets and helpers the callbacks above reach as module globals
+    global root, db_worker, main_canvas, logo_label, refresh_handlers
+    global name_entry, email_entry, dept_entry, add_btn, delete_btn, import_employees_btn
+    global employee_listbox, employee_view
+    global product_name_entry, product_category_combobox, product_price_entry, product_quantity_entry
+    global image_btn, image_label, add_product_btn, delete_product_btn, import_products_btn
+    global search_entry, live_search, product_listbox, product_view, photo_cache
+    global category_name_entry, add_category_btn, delete_category_btn, category_listbox, category_view
+    global dashboard_totals, dashboard_view, filter_widgets, product_table_frame
+    instrumentation.startup_began(STARTED)
+    instrumentation.mark_startup("imports")
+    # Time every database and image call; Ctrl+Shift+D shows the numbers
+    instrumentation.enable()
+    instrumentation.instrument(database, [
+        "list_employees", "query_employees", "add_employee", "delete_employees", "update_employees",
+        "list_products", "query_products", "get_products", "add_product", "delete_products", "update_products", "search_products",
+        "list_categories", "category_names", "department_names", "add_category", "delete_categories",
+        "inventory_summary",
+        "get_product_image_ref", "get_thumbnail", "set_thumbnail",
+    ])
+    instrumentation.instrument(thumbnails, ["make_thumbnail"])
+    instrumentation.instrument(image_pipeline, ["ingest"])
+    # Timed but not traced: tracing every executemany row would double the import time
+    instrumentation.instrument(bulk_import, ["import_file"], trace=False)
+    instrumentation.instrument(product_cache.ProductCache, ["load", "sync", "query", "count", "search"], prefix="product_cache")
+    # Installed over the timed functions, so cache hits cost no database call
+    query_cache.install(read_cache, database, reads={
+        "list_categories": ("categories",),
+        "category_names": ("categories",),
+        "department_names": ("departments",),
+        "inventory_summary": ("categories", "products"),
+        "get_product_image_ref": ("products",),
+    }, writes={
+        "add_employee": ("employees", "departments"),
+        "update_employees": ("employees", "departments"),
+        "delete_employees": ("employees",),
+        "add_category": ("categories",),
+        "delete_categories": ("categories",),
+        "add_product": ("products",),
+        "update_products": ("products",),
+        "delete_products": ("products",),
+    })
+    query_cache.install(read_cache, bulk_import, writes={"import_file": database.TRACKED_TABLES})
+    instrumentation.add_counters("query_cache", read_cache.stats)
+    root = tk.Tk()
+    root.title("Employee & Product Management System")
+    root.geometry("1200x800")
+    root.configure(bg="#eaf0fa")  # خلفية هادئة
+    db_worker = DBWorker(root)
+
+
+    # Create main container for centering
+    main_container = tk.Frame(root, bg="#eaf0fa")
+    main_container.pack(expand=True, fill="both", padx=20, pady=20)
+
+    # Create canvas for scrolling
+    main_canvas = tk.Canvas(main_container, bg="#eaf0fa", highlightthickness=0)
+    main_canvas.pack(side="left", fill="both", expand=True)
+    main_scrollbar = tk.Scrollbar(main_container, orient="vertical", command=main_canvas.yview)
+    main_scrollbar.pack(side="right", fill="y")
+    main_canvas.configure(yscrollcommand=main_scrollbar.set)
+
+    # Create content frame with proper centering
+    content_frame = tk.Frame(main_canvas, bg="#eaf0fa")
+    main_canvas.create_window((0, 0), window=content_frame, anchor="nw")
+
+    content_frame.bind("<Configure>", on_configure)
+
+    # Configure grid weights for centering
+    content_frame.grid_columnconfigure(0, weight=1)
+    content_frame.grid_columnconfigure(1, weight=1)
+    content_frame.grid_columnconfigure(2, weight=1)
+    content_frame.grid_columnconfigure(3, weight=1)
+
+    # Header section - centered
+    header_frame = tk.Frame(content_frame, bg="#eaf0fa")
+    header_frame.grid(row=0, column=0, columnspan=4, pady=(0, 20), sticky="ew")
+
+    # Placeholder until load_logo() swaps in logo.png after the data is loaded
+    logo_label = tk.Label(header_frame, text="🛰️", font=("Arial", 36), bg="#eaf0fa")
+    logo_label.pack(side="left", padx=(0, 10))
+
+    main_title = tk.Label(header_frame, text="Employee & Product Management System", font=("Arial", 28, "bold"), fg="#d32f2f", bg="#eaf0fa")
+    main_title.pack(side="left")
+
+    # Employee Form - centered
+    emp_frame = tk.LabelFrame(content_frame, text="إضافة موظف", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    emp_frame.grid(row=1, column=0, columnspan=2, padx=(0, 10), pady=10, sticky="nsew")
+
+    emp_label_style = {"font": ("Arial", 12), "bg": "#f5f7fa"}
+    emp_entry_style = {"font": ("Arial", 12), "bd": 1, "relief": "solid", "bg": "#fff"}
+
+    name_label = tk.Label(emp_frame, text="Employee Name", **emp_label_style)
+    name_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    name_entry = tk.Entry(emp_frame, **emp_entry_style)
+    name_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    email_label = tk.Label(emp_frame, text="Email", **emp_label_style)
+    email_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    email_entry = tk.Entry(emp_frame, **emp_entry_style)
+    email_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    dept_label = tk.Label(emp_frame, text="Department", **emp_label_style)
+    dept_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+    # Editable: existing departments are suggested, new ones are created on save
+    dept_entry = ttk.Combobox(emp_frame, font=("Arial", 12))
+    dept_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+
+    # Configure employee frame grid weights
+    emp_frame.grid_columnconfigure(1, weight=1)
+
+    add_btn = tk.Button(emp_frame, text="Add Employee", command=add_employee, font=("Arial", 12, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    add_btn.grid(row=3, column=0, columnspan=2, pady=15, ipadx=20, sticky="ew")
+
+    # Employee Table - centered
+    employee_table_frame = tk.LabelFrame(content_frame, text="قائمة الموظفين", font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    employee_table_frame.grid(row=2, column=0, columnspan=2, padx=(0, 10), pady=10, sticky="nsew")
+
+    # Facet filter bar: department
+    employee_filter_frame = tk.Frame(employee_table_frame, bg="#f5f7fa")
+    employee_filter_frame.grid(row=0, column=0, columnspan=2, pady=5, sticky="ew")
+    tk.Label(employee_filter_frame, text="القسم", font=("Arial", 11), bg="#f5f7fa").pack(side="left", padx=(5, 5))
+    department_filter = ttk.Combobox(employee_filter_frame, state="readonly", font=("Arial", 11), width=14)
+    department_filter.pack(side="left", padx=(0, 5))
+    department_filter.bind("<<ComboboxSelected>>", lambda event: apply_filters("employees"))
+    tk.Button(employee_filter_frame, text="مسح", command=lambda: clear_filters("employees"), font=("Arial", 10, "bold"), bg="#757575", fg="#fff", bd=0, relief="ridge", cursor="hand2").pack(side="left", padx=(0, 5))
+
+    employee_columns = ("ID", "Name", "Email", "Department")
+    employee_listbox = ttk.Treeview(employee_table_frame, columns=employee_columns, show='headings', height=7, selectmode="extended")
+    for col in employee_columns:
+        # Clicking a heading sorts in SQL, through the matching index
+        employee_listbox.heading(col, text=col, command=lambda c=col: sort_table("employees", c))
+        employee_listbox.column(col, width=110)
+    employee_listbox.grid(row=1, column=0, pady=5, padx=5, sticky="nsew")
+
+    # Scrollbar for employee table (rows are loaded page by page as it moves)
+    employee_scrollbar = tk.Scrollbar(employee_table_frame, orient="vertical", command=employee_listbox.yview)
+    employee_view = VirtualTable(employee_listbox, employee_scrollbar, run=db_worker.submit)
+    employee_scrollbar.grid(row=1, column=1, sticky="ns")
+
+    # Configure employee table frame grid weights
+    employee_table_frame.grid_columnconfigure(0, weight=1)
+    employee_table_frame.grid_rowconfigure(1, weight=1)
+
+    style = ttk.Style()
+    style.configure("Treeview", font=("Arial", 11), rowheight=28, background="#fff", fieldbackground="#fff")
+    style.configure("Treeview.Heading", font=("Arial", 12, "bold"), background="#1976d2", foreground="#000")
+
+    # Employee Delete Button
+    delete_btn = tk.Button(employee_table_frame, text="Delete Employee", command=delete_employee, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    delete_btn.grid(row=2, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+    import_employees_btn = tk.Button(employee_table_frame, text="استيراد موظفين (CSV/JSON)", command=lambda: import_records("employees"), font=("Arial", 11, "bold"), bg="#1976d2", fg="#fff", activebackground="#1565c0", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    import_employees_btn.grid(row=3, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+    edit_employees_btn = tk.Button(employee_table_frame, text="تعديل المحدد", command=lambda: bulk_edit("employees"), font=("Arial", 11, "bold"), bg="#f57c00", fg="#fff", activebackground="#ef6c00", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    edit_employees_btn.grid(row=4, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+
+    # Product Form - centered
+    prod_frame = tk.LabelFrame(content_frame, text="إضافة منتج", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    prod_frame.grid(row=1, column=2, columnspan=2, padx=(10, 0), pady=10, sticky="nsew")
+
+    prod_label_style = {"font": ("Arial", 12), "bg": "#f5f7fa"}
+    prod_entry_style = {"font": ("Arial", 12), "bd": 1, "relief": "solid", "bg": "#fff"}
+
+    product_name_label = tk.Label(prod_frame, text="Product Name", **prod_label_style)
+    product_name_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    product_name_entry = tk.Entry(prod_frame, **prod_entry_style)
+    product_name_entry.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+
+    product_category_label = tk.Label(prod_frame, text="Category", **prod_label_style)
+    product_category_label.grid(row=0, column=2, padx=5, pady=5, sticky="w")
+    product_category_combobox = ttk.Combobox(prod_frame, state="readonly", font=("Arial", 11))
+    product_category_combobox.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+
+    product_price_label = tk.Label(prod_frame, text="Price", **prod_label_style)
+    product_price_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    product_price_entry = tk.Entry(prod_frame, **prod_entry_style)
+    product_price_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+
+    product_quantity_label = tk.Label(prod_frame, text="الكمية", **prod_label_style)
+    product_quantity_label.grid(row=1, column=2, padx=5, pady=5, sticky="w")
+    product_quantity_entry = tk.Entry(prod_frame, **prod_entry_style)
+    product_quantity_entry.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+
+    image_btn = tk.Button(prod_frame, text="اختيار صورة", command=choose_image, font=("Arial", 11), bg="#1976d2", fg="#fff", activebackground="#1565c0", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    image_btn.grid(row=2, column=0, pady=5, ipadx=10, sticky="w")
+    image_label = tk.Label(prod_frame, text="No image selected", font=("Arial", 10), bg="#f5f7fa")
+    image_label.grid(row=2, column=1, pady=5, sticky="w")
+
+    # Configure product frame grid weights
+    prod_frame.grid_columnconfigure(1, weight=1)
+    prod_frame.grid_columnconfigure(3, weight=1)
+
+    add_product_btn = tk.Button(prod_frame, text="Add Product", command=add_product, font=("Arial", 12, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    add_product_btn.grid(row=3, column=0, columnspan=4, pady=15, ipadx=20, sticky="ew")
+
+    # Product Table - centered
+    product_table_frame = tk.LabelFrame(content_frame, text="قائمة المنتجات", font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    product_table_frame.grid(row=2, column=2, columnspan=2, padx=(10, 0), pady=10, sticky="nsew")
+
+    # Search section
+    search_frame = tk.Frame(product_table_frame, bg="#f5f7fa")
+    search_frame.grid(row=0, column=0, columnspan=2, pady=5, sticky="ew")
+
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(search_frame, textvariable=search_var, font=("Arial", 12), width=18)
+    search_entry.pack(side="left", padx=(5, 5))
+    search_entry.bind("<Return>", lambda event: search_products())
+    search_btn = tk.Button(search_frame, text="بحث", command=search_products, font=("Arial", 11, "bold"), bg="#1976d2", fg="#fff", bd=0, relief="ridge", cursor="hand2")
+    search_btn.pack(side="left", padx=(0, 5))
+    live_search = LiveSearch(root, run_search, show_search_results)
+    search_var.trace_add("write", on_search_changed)
+
+    # Facet filter bar: category, price range and quantity range
+    product_filter_frame = tk.Frame(product_table_frame, bg="#f5f7fa")
+    product_filter_frame.grid(row=1, column=0, columnspan=2, pady=5, sticky="ew")
+    tk.Label(product_filter_frame, text="الفئة", font=("Arial", 11), bg="#f5f7fa").pack(side="left", padx=(5, 5))
+    category_filter = ttk.Combobox(product_filter_frame, state="readonly", font=("Arial", 11), width=10)
+    category_filter.pack(side="left", padx=(0, 5))
+    category_filter.bind("<<ComboboxSelected>>", lambda event: apply_filters("products"))
+    range_entries = {}
+    for label, low, high in (("السعر", "min_price", "max_price"), ("الكمية", "min_quantity", "max_quantity")):
+        tk.Label(product_filter_frame, text=label, font=("Arial", 11), bg="#f5f7fa").pack(side="left", padx=(5, 5))
+        for name in (low, high):
+            entry = tk.Entry(product_filter_frame, font=("Arial", 11), width=6)
+            entry.pack(side="left", padx=(0, 2))
+            entry.bind("<Return>", lambda event: apply_filters("products"))
+            range_entries[name] = entry
+    tk.Button(product_filter_frame, text="تصفية", command=lambda: apply_filters("products"), font=("Arial", 10, "bold"), bg="#1976d2", fg="#fff", bd=0, relief="ridge", cursor="hand2").pack(side="left", padx=(5, 5))
+    tk.Button(product_filter_frame, text="مسح", command=lambda: clear_filters("products"), font=("Arial", 10, "bold"), bg="#757575", fg="#fff", bd=0, relief="ridge", cursor="hand2").pack(side="left")
+    filter_widgets = {
+        "employees": {"department": department_filter},
+        "products": {"category": category_filter, **range_entries},
+    }
+
+    product_columns = ("ID", "Name", "Category", "Price", "Quantity")
+    product_listbox = ttk.Treeview(product_table_frame, columns=product_columns, show='headings', height=7, selectmode="extended")
+    for col in product_columns:
+        product_listbox.heading(col, text=col, command=lambda c=col: sort_table("products", c))
+        product_listbox.column(col, width=110)
+    product_listbox.grid(row=2, column=0, pady=5, padx=5, sticky="nsew")
+
+    # Scrollbar for product table (rows are loaded page by page as it moves)
+    product_scrollbar = tk.Scrollbar(product_table_frame, orient="vertical", command=product_listbox.yview)
+    product_view = VirtualTable(product_listbox, product_scrollbar, run=db_worker.submit)
+    product_scrollbar.grid(row=2, column=1, sticky="ns")
+
+    # Configure product table frame grid weights
+    product_table_frame.grid_columnconfigure(0, weight=1)
+    product_table_frame.grid_rowconfigure(2, weight=1)
+
+    # Product Delete Button
+    delete_product_btn = tk.Button(product_table_frame, text="Delete Product", command=delete_product, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    delete_product_btn.grid(row=3, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+    import_products_btn = tk.Button(product_table_frame, text="استيراد منتجات (CSV/JSON)", command=lambda: import_records("products"), font=("Arial", 11, "bold"), bg="#1976d2", fg="#fff", activebackground="#1565c0", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    import_products_btn.grid(row=4, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+    edit_products_btn = tk.Button(product_table_frame, text="تعديل المحدد", command=lambda: bulk_edit("products"), font=("Arial", 11, "bold"), bg="#f57c00", fg="#fff", activebackground="#ef6c00", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    edit_products_btn.grid(row=5, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+
+    # عند تحديد منتج، عرض صورته
+    # Decoded thumbnails, keyed by image hash, so reopening a product image is instant
+    photo_cache = thumbnails.PhotoCache()
+
+    # --- Category UI ---
+    category_frame = tk.LabelFrame(content_frame, text="إدارة الفئات", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    category_frame.grid(row=3, column=0, columnspan=2, pady=20, padx=(0, 10), sticky="nsew")
+
+    # Category input section
+    category_input_frame = tk.Frame(category_frame, bg="#f5f7fa")
+    category_input_frame.grid(row=0, column=0, columnspan=2, pady=(0, 10), sticky="ew")
+
+    category_name_entry = tk.Entry(category_input_frame, font=("Arial", 12), bd=1, relief="solid", bg="#fff")
+    category_name_entry.pack(side="left", padx=(0, 10), fill="x", expand=True)
+
+    add_category_btn = tk.Button(category_input_frame, text="إضافة فئة", command=add_category, font=("Arial", 11, "bold"), bg="#388e3c", fg="#fff", activebackground="#2e7d32", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    add_category_btn.pack(side="left", padx=(0, 10))
+
+    # Configure category input frame
+    category_input_frame.grid_columnconfigure(0, weight=1)
+
+    category_listbox = ttk.Treeview(category_frame, columns=("ID", "Name"), show='headings', height=4, selectmode="extended")
+    category_listbox.heading("ID", text="ID")
+    category_listbox.heading("Name", text="اسم الفئة")
+    category_listbox.column("ID", width=40)
+    category_listbox.column("Name", width=200)
+    category_listbox.grid(row=1, column=0, pady=5, padx=5, sticky="nsew")
+    category_view = TreeviewReconciler(category_listbox)
+
+    # Scrollbar for category table
+    category_scrollbar = tk.Scrollbar(category_frame, orient="vertical", command=category_listbox.yview)
+    category_listbox.configure(yscrollcommand=category_scrollbar.set)
+    category_scrollbar.grid(row=1, column=1, sticky="ns")
+
+    # Configure category frame grid weights
+    category_frame.grid_columnconfigure(0, weight=1)
+    category_frame.grid_rowconfigure(1, weight=1)
+
+    delete_category_btn = tk.Button(category_frame, text="حذف الفئة", command=delete_category, font=("Arial", 11, "bold"), bg="#d32f2f", fg="#fff", activebackground="#b71c1c", activeforeground="#fff", bd=0, relief="ridge", cursor="hand2")
+    delete_category_btn.grid(row=2, column=0, columnspan=2, pady=5, ipadx=10, sticky="ew")
+
+    # --- Inventory dashboard UI ---
+    dashboard_frame = tk.LabelFrame(content_frame, text="لوحة المخزون", padx=15, pady=15, font=("Arial", 13, "bold"), bg="#f5f7fa", fg="#1976d2")
+    dashboard_frame.grid(row=3, column=2, columnspan=2, pady=20, sticky="nsew")
+
+    dashboard_totals = tk.Label(dashboard_frame, font=("Arial", 11, "bold"), bg="#f5f7fa", fg="#333", anchor="e")
+    dashboard_totals.grid(row=0, column=0, columnspan=2, pady=(0, 10), sticky="ew")
+
+    dashboard_columns = ("ID", "Category", "Products", "Quantity", "Value", "Low")
+    dashboard_listbox = ttk.Treeview(dashboard_frame, columns=dashboard_columns, show='headings', height=4)
+    for col, text, width in zip(dashboard_columns, ("ID", "الفئة", "المنتجات", "الكمية", "القيمة", "منخفض"), (40, 140, 80, 80, 110, 70)):
+        dashboard_listbox.heading(col, text=text)
+        dashboard_listbox.column(col, width=width, anchor="w" if col == "Category" else "e")
+    dashboard_listbox.grid(row=1, column=0, pady=5, padx=5, sticky="nsew")
+    dashboard_view = TreeviewReconciler(dashboard_listbox)
+
+    dashboard_scrollbar = tk.Scrollbar(dashboard_frame, orient="vertical", command=dashboard_listbox.yview)
+    dashboard_listbox.configure(yscrollcommand=dashboard_scrollbar.set)
+    dashboard_scrollbar.grid(row=1, column=1, sticky="ns")
+
+    dashboard_frame.grid_columnconfigure(0, weight=1)
+    dashboard_frame.grid_rowconfigure(1, weight=1)
+
+    # بعد تعريف main_canvas:
+    main_canvas.bind_all('<Down>', _on_mousewheel)
+    main_canvas.bind_all('<Up>', _on_mousewheel)
+
+    # Hidden diagnostics window
+    root.bind_all("<Control-Shift-D>", show_diagnostics)
+
+    # اربط النقر المزدوج:
+    product_listbox.bind("<Double-1>", on_product_select)
+
+    # Handle window close event to ensure data is saved
+    root.protocol("WM_DELETE_WINDOW", on_closing)
+
+    # Center the window
+    center_window()
+    instrumentation.mark_startup("window built")
+
+    # The data is loaded once the first frame is on screen
+    root.bind("<Map>", on_first_map)
+
+    # Refresh only the views whose tables another instance or process changed
+    refresh_handlers = {
+        "categories": (show_categories, update_category_combobox, show_dashboard),
+        "departments": (update_department_combobox,),
+        "employees": (employee_view.refresh,),
+        "products": (product_view.refresh, show_dashboard, show_product_count),
+    }
+
+    root.mainloop()
 
-# Start auto-refresh
-root.after(30000, auto_refresh_data)
 
-root.mainloop()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic data generator and benchmark for the CRUD hot paths.
+
+Builds databases of the requested sizes from a fixed seed (products with a
+skewed category distribution, a tenth as many employees, optionally some
+product images), then times the operations the app performs, headlessly:
+
+    python benchmark.py --sizes 10k 100k 1M --seed 42 --images 20 --output bench.json
+
+Generated databases are kept in --data-dir and reused by later runs with
+the same size, seed and image count. Results are written as JSON so runs
+can be compared across versions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+import database
+import product_cache
+
+DATA_DIR = "benchmark_data"
+DEFAULT_SIZES = ["10k", "100k"]
+DEFAULT_REPEAT = 5
+CATEGORY_COUNT = 60
+# Category popularity follows a Zipf-like law: a few large, many small
+CATEGORY_SKEW = 1.1
+IMAGE_SIZE = (1024, 768)
+INSERT_BATCH = 10000
+
+WORDS = [
+    "قلم", "دفتر", "حاسوب", "شاشة", "طابعة", "كرسي", "مكتب", "هاتف", "سماعة", "كابل",
+    "pen", "notebook", "laptop", "monitor", "printer", "chair", "desk", "phone", "headset", "cable",
+    "mouse", "keyboard", "lamp", "bag", "battery", "charger", "router", "camera", "paper", "ink",
+]
+DEPARTMENTS = ["HR", "Sales", "IT", "Finance", "Support", "Marketing", "المبيعات", "الموارد البشرية"]
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def use_database(path):
+    """Point database.py (and every pooled connection) at another file"""
+    database.close_all()
+    database.DB_PATH = path
+
+
+# --- Data generation ---
+def _product_rows(rng, count, categories, weights):
+    for start in range(0, count, INSERT_BATCH):
+        picks = rng.choices(categories, weights, k=min(INSERT_BATCH, count - start))
+        yield [
+            (f"{rng.choice(WORDS)} {rng.choice(WORDS)} {start + i}", category,
+             round(rng.lognormvariate(3, 1), 2), rng.randint(0, 500))
+            for i, category in enumerate(picks)
+        ]
+
+
+def _employee_rows(rng, count):
+    rows = [
+        (f"{rng.choice(WORDS)} {i}", f"employee{i}@example.com", rng.choice(DEPARTMENTS))
+        for i in range(count)
+    ]
+    for start in range(0, count, INSERT_BATCH):
+        yield rows[start:start + INSERT_BATCH]
+
+
+def _synthetic_image(rng):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", IMAGE_SIZE, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        box = sorted(rng.randrange(IMAGE_SIZE[0]) for _ in range(2)), sorted(rng.randrange(IMAGE_SIZE[1]) for _ in range(2))
+        draw.rectangle((box[0][0], box[1][0], box[0][1], box[1][1]), fill=tuple(rng.randrange(256) for _ in range(3)))
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def generate(path, rows, seed=42, images=0):
+    """Create a database with `rows` products, rows // 10 employees and `images` distinct images"""
+    import thumbnails
+
+    if os.path.exists(path):
+        os.remove(path)
+    use_database(path)
+    database.init_db()
+    rng = random.Random(seed)
+    categories = [f"category {i}" for i in range(CATEGORY_COUNT)]
+    weights = [1 / (rank + 1) ** CATEGORY_SKEW for rank in range(CATEGORY_COUNT)]
+    started = time.perf_counter()
+
+    with database.transaction() as conn:
+        database.ensure_categories(conn, categories)
+        for batch in _product_rows(rng, rows, categories, weights):
+            database.insert_products(conn, batch)
+        for batch in _employee_rows(rng, max(rows // 10, 1)):
+            database.insert_employees(conn, batch)
+
+    # Each image is shared by a handful of products, as with real catalog photos
+    for _ in range(images):
+        data = _synthetic_image(rng)
+        digest = database.store_image(data, thumbnails.make_thumbnail(data))
+        ids = [rng.randint(1, rows) for _ in range(5)]
+        with database.transaction() as conn:
+            conn.executemany("UPDATE products SET image_hash=? WHERE id=?", ((digest, i) for i in ids))
+
+    database.prune_change_log()
+    database.get_connection().execute("PRAGMA optimize")
+    print(f"Generated {path}: {rows} products, {images} images in {time.perf_counter() - started:.1f}s")
+
+
+# --- Timing ---
+def timed(fn, repeat=DEFAULT_REPEAT):
+    """Run fn() `repeat` times; return timing statistics in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def _export(path):
+    import check_database
+
+    check_database.DB_FILE = path
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        check_database.check_database(output=os.path.join(tmp, "export.sql"), images="skip")
+
+
+def _decode_popup_image(product_id):
+    """What the image popup does before handing the picture to Tk"""
+    from PIL import Image
+
+    _, digest = database.get_product_image_ref(product_id)
+    thumb = database.get_thumbnail(digest)
+    Image.open(io.BytesIO(thumb)).load()
+
+
+def run_benchmarks(path, repeat=DEFAULT_REPEAT, export_repeat=1):
+    """Time the app's hot paths against the database at `path`"""
+    use_database(path)
+    conn = database.get_connection()
+    rows = conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+    max_id = conn.execute("SELECT MAX(id) FROM products").fetchone()[0] or 0
+    category = conn.execute("SELECT category FROM products_fts LIMIT 1").fetchone()
+    results = {}
+
+    def bench(name, fn, runs=repeat):
+        results[name] = timed(fn, runs)
+        print(f"  {name:<28} median {results[name]['median_ms']:>10.3f} ms")
+
+    bench("list_products_first_page", lambda: database.list_products(limit=200))
+    bench("list_products_deep_page", lambda: database.list_products(after_id=int(max_id * 0.9), limit=200))
+    bench("list_employees_first_page", lambda: database.list_employees(limit=200))
+    deep_row = conn.execute(f"{database.PRODUCT_SELECT} ORDER BY p.price, p.id LIMIT 1 OFFSET ?",
+                            (int(rows * 0.9),)).fetchone()
+    bench("sort_price_deep_page", lambda: database.query_products(sort="price", after=deep_row, limit=200))
+    category_row = conn.execute(f"{database.PRODUCT_SELECT} ORDER BY c.name, p.name, p.id LIMIT 1 OFFSET ?",
+                                (int(rows * 0.5),)).fetchone()
+    bench("sort_category_deep_page", lambda: database.query_products(sort="category", after=category_row, limit=200))
+    bench("filter_category_sort_name", lambda: database.query_products({"category": "category 0"}, "name", limit=200))
+    bench("filter_price_sort_quantity",
+          lambda: database.query_products({"min_price": 10, "max_price": 20}, "quantity", True, limit=200))
+    cache = product_cache.ProductCache()
+    bench("product_cache_load", cache.load, 1)
+    bench("product_cache_sort_price_deep", lambda: cache.query(sort="price", after=deep_row, limit=200))
+    bench("product_cache_count_filtered", lambda: cache.count({"min_price": 10, "max_price": 20}))
+    bench("product_cache_search_infix", lambda: cache.search("aptop"))
+    memory = {
+        "product_cache": cache.memory_bytes(),
+        "tuples": product_cache.tuple_bytes(conn.execute(database.PRODUCT_SELECT).fetchall()),
+    }
+    bench("category_combobox", database.category_names)
+    bench("search_prefix", lambda: database.search_products("lap"))
+    bench("search_arabic", lambda: database.search_products("حاس"))
+    if category:
+        bench("search_category", lambda: database.search_products(category[0]))
+    bench("search_price_filter", lambda: database.search_products("price<5"))
+
+    inserted = []
+
+    def insert_one():
+        inserted.append(database.add_product("benchmark item", "category 0", 9.99, 1).id)
+    bench("insert_product", insert_one, repeat * 10)
+
+    def insert_batch():
+        with database.transaction() as conn:
+            database.insert_products(conn, [("benchmark batch", "category 1", 1.0, 1)] * 1000)
+    bench("insert_1000_products", insert_batch)
+
+    bench("delete_product", lambda: database.delete_products([inserted.pop()]), repeat * 10)
+    batch_ids = [row[0] for row in conn.execute("SELECT id FROM products WHERE name='benchmark batch'")]
+    chunks = [batch_ids[i:i + 1000] for i in range(0, len(batch_ids), 1000)]
+    bench("delete_1000_products", lambda: database.delete_products(chunks.pop()), len(chunks))
+
+    image_row = conn.execute("SELECT id FROM products WHERE image_hash IS NOT NULL LIMIT 1").fetchone()
+    if image_row:
+        bench("image_popup_decode", lambda: _decode_popup_image(image_row[0]))
+    bench("export_check_database", lambda: _export(path), export_repeat)
+
+    database.prune_change_log()
+    database.close_all()
+    return {"rows": rows, "file_bytes": os.path.getsize(path), "memory_bytes": memory, "results": results}
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic databases and time the CRUD hot paths")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="product counts, e.g. 10k 100k 1M")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--images", type=int, default=0, help="distinct product images per database")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--regenerate", action="store_true", help="rebuild databases even if they exist")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "images": args.images,
+        "databases": {},
+    }
+    for size in args.sizes:
+        rows = parse_size(size)
+        path = os.path.join(args.data_dir, f"bench_{rows}_s{args.seed}_i{args.images}.db")
+        if args.regenerate or not os.path.exists(path):
+            generate(path, rows, args.seed, args.images)
+        print(f"Benchmarking {path}")
+        report["databases"][size] = run_benchmarks(path, args.repeat)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
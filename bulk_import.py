@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk import of employees or products from CSV, JSON Lines or JSON files.
+
+CSV and JSON Lines input is streamed row by row (a JSON file holding one
+array of objects is read whole), and every row is validated the same way the forms
+validate it. Valid rows are inserted with executemany in batches, all
+inside one transaction, and missing product categories and employee
+departments are created on the way. Employees whose email is already
+taken are rejected row by row. Usage:
+
+    python bulk_import.py products catalog.csv [--batch-size 5000]
+    python bulk_import.py employees staff.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+import database
+
+DEFAULT_BATCH_SIZE = 5000
+
+FIELDS = {
+    "employees": ("name", "email", "department"),
+    "products": ("name", "category", "price", "quantity"),
+}
+
+
+class ImportReport:
+    """Counts and timing of one import run"""
+
+    def __init__(self, kind, path):
+        self.kind = kind
+        self.path = path
+        self.read = 0
+        self.inserted = 0
+        self.rejected = []  # (line number, reason)
+        self.categories_before = 0
+        self.categories_created = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        lines = [
+            f"Imported {self.inserted} of {self.read} {self.kind} from {os.path.basename(self.path)}",
+            f"Time: {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)",
+            f"Rejected rows: {len(self.rejected)}",
+        ]
+        if self.kind == "products":
+            lines.append(f"New categories: {self.categories_created}")
+        for line_no, reason in self.rejected[:10]:
+            lines.append(f"  line {line_no}: {reason}")
+        if len(self.rejected) > 10:
+            lines.append(f"  ... and {len(self.rejected) - 10} more")
+        return "\n".join(lines)
+
+
+def _json_record(record):
+    if not isinstance(record, dict):
+        return ValueError("expected a JSON object")
+    return {str(k).strip().lower(): v for k, v in record.items()}
+
+
+def _starts_with_array(f):
+    """Whether the first non-blank character of f is '['; leaves f where it was"""
+    position = f.tell()
+    while True:
+        char = f.read(1)
+        if not char or not char.isspace():
+            f.seek(position)
+            return char == "["
+
+
+def read_records(path):
+    """Yield (line number, dict) from a CSV file, a JSON Lines file or a JSON array of objects.
+
+    Records of a JSON array are numbered from 1 instead of by line.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, {k.strip().lower(): v for k, v in record.items() if k}
+        elif _starts_with_array(f):
+            try:
+                records = json.load(f)
+            except json.JSONDecodeError as e:
+                yield e.lineno, ValueError(f"invalid JSON: {e.msg}")
+                return
+            for number, record in enumerate(records, 1):
+                yield number, _json_record(record)
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, ValueError(f"invalid JSON: {e.msg}")
+                    continue
+                yield line_no, _json_record(record)
+
+
+def import_file(kind, path, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Import `kind` ("employees" or "products") from `path` in one transaction.
+
+    `progress(report)` is called after every batch. Returns an ImportReport.
+    """
+    fields = FIELDS[kind]
+    validate = database.validate_employee if kind == "employees" else database.validate_product
+    insert = database.insert_employees if kind == "employees" else database.insert_products
+    report = ImportReport(kind, path)
+    started = time.perf_counter()
+
+    with database.transaction() as conn:
+        report.categories_before = conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+        batch = []
+        lines = []
+        seen_emails = set()
+
+        def flush():
+            if kind == "products":
+                database.ensure_categories(conn, {row[1] for row in batch})
+            else:
+                taken = database.existing_emails(conn, [row[1] for row in batch])
+                kept = []
+                for line_no, row in zip(lines, batch):
+                    if row[1].lower() in taken:
+                        report.rejected.append((line_no, f"email already exists: {row[1]}"))
+                    else:
+                        kept.append(row)
+                batch[:] = kept
+            insert(conn, batch)
+            report.inserted += len(batch)
+            batch.clear()
+            lines.clear()
+            if progress:
+                progress(report)
+
+        for line_no, record in read_records(path):
+            report.read += 1
+            if isinstance(record, Exception):
+                report.rejected.append((line_no, str(record)))
+                continue
+            try:
+                row = validate(*(record.get(field) for field in fields))
+            except ValueError as e:
+                report.rejected.append((line_no, str(e)))
+                continue
+            if kind == "employees":
+                if row[1].lower() in seen_emails:
+                    report.rejected.append((line_no, f"duplicate email in file: {row[1]}"))
+                    continue
+                seen_emails.add(row[1].lower())
+            batch.append(row)
+            lines.append(line_no)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        report.categories_created = conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0] - report.categories_before
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import employees or products from CSV/JSONL/JSON")
+    parser.add_argument("kind", choices=sorted(FIELDS))
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        database.init_db()
+        report = import_file(
+            args.kind, args.path, args.batch_size,
+            progress=lambda r: print(f"  {r.inserted} rows inserted..."),
+        )
+    finally:
+        database.close_all()
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
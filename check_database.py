@@ -1,131 +1,459 @@
-import sqlite3
+import argparse
+import gzip
+import hashlib
+import math
 import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+DB_FILE = 'employees.db'
+EXPORT_FILE = 'employees_mysql_export.sql'
+IMAGES_EXPORT_DIR = 'employees_export_images'
+
+# Rows read from SQLite per fetchmany() call
+FETCH_SIZE = 500
+# Limits for a single multi-row INSERT statement
+BATCH_ROWS = 500
+BATCH_BYTES = 1024 * 1024
+# Size of the pieces BLOB hex is written in
+HEX_CHUNK = 64 * 1024
+# Tables bigger than this are exported in id-range shards when running in parallel
+SHARD_ROWS = 100000
+
+# MySQL cannot index unsized TEXT; keys, unique and foreign key columns use this
+# (enough for image hashes, names and emails, and within InnoDB's utf8mb4 key limit)
+KEYED_TEXT = 'VARCHAR(255)'
+
+# Bookkeeping tables that only make sense inside the SQLite app
+INTERNAL_TABLES = {'change_log'}
+
+
+def exportable_tables(cursor):
+    """User tables worth exporting: no sqlite_* tables, virtual tables or their shadow tables"""
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type='table' ORDER BY rowid")
+    rows = cursor.fetchall()
+    virtual = [name for name, sql in rows if sql and sql.upper().startswith('CREATE VIRTUAL')]
+    tables = []
+    for name, sql in rows:
+        if name.startswith('sqlite_') or name in INTERNAL_TABLES or name in virtual:
+            continue
+        if any(name.startswith(v + '_') for v in virtual):
+            continue
+        tables.append((name, sql))
+    return tables
+
+
+def _mysql_type(declared, keyed):
+    """MySQL column type for a SQLite declared type; keyed columns need a sized type"""
+    declared = declared.upper()
+    if 'INT' in declared:
+        return 'INT'
+    if any(word in declared for word in ('CHAR', 'CLOB', 'TEXT')) or not declared:
+        return KEYED_TEXT if keyed else 'LONGTEXT'
+    if 'BLOB' in declared:
+        return 'LONGBLOB'
+    if any(word in declared for word in ('REAL', 'FLOA', 'DOUB')):
+        return 'DOUBLE'
+    return 'DECIMAL(20, 6)'
+
+
+def mysql_schema(cursor, table_name, skipped=()):
+    """MySQL CREATE TABLE for a SQLite table, built from its columns, keys and foreign keys.
+
+    Foreign keys to tables in `skipped` (whose rows are not exported) are left out.
+    """
+    columns = cursor.execute(f"PRAGMA table_info({table_name})").fetchall()
+    foreign_keys = cursor.execute(f"PRAGMA foreign_key_list({table_name})").fetchall()
+    unique = []
+    for _, index_name, is_unique, _, _ in cursor.execute(f"PRAGMA index_list({table_name})").fetchall():
+        info = cursor.execute(f"PRAGMA index_info({index_name})").fetchall()
+        # Expression indexes (column id -2) have no MySQL counterpart here
+        if is_unique and all(cid >= 0 for _, cid, _ in info):
+            unique.append([name for _, _, name in info])
+    primary = [col[1] for col in sorted(columns, key=lambda col: col[5]) if col[5]]
+    referencing = {fk[3] for fk in foreign_keys}
+    keyed = set(primary) | referencing | {name for names in unique for name in names}
+    # A lone integer primary key is SQLite's rowid; it only counts up if nothing else assigns it
+    auto_increment = (len(primary) == 1 and primary[0] not in referencing
+                      and 'INT' in next(col[2] for col in columns if col[1] == primary[0]).upper())
+
+    lines = []
+    for _, name, declared, notnull, default, _ in columns:
+        line = f"`{name}` {_mysql_type(declared, name in keyed)}"
+        if notnull:
+            line += ' NOT NULL'
+        if default is not None:
+            line += f' DEFAULT {default}'
+        if auto_increment and name == primary[0]:
+            line += ' AUTO_INCREMENT'
+        lines.append(line)
+    if primary:
+        lines.append(f"PRIMARY KEY (`{'`, `'.join(primary)}`)")
+    for names in unique:
+        if names != primary:
+            lines.append(f"UNIQUE KEY (`{'`, `'.join(names)}`)")
+    for _, _, table, column, ref_column, _, on_delete, _ in foreign_keys:
+        if table in skipped:
+            continue
+        line = f"FOREIGN KEY (`{column}`) REFERENCES `{table}` (`{ref_column}`)"
+        if on_delete not in ('NO ACTION', 'RESTRICT'):
+            line += f' ON DELETE {on_delete}'
+        lines.append(line)
+    return f"CREATE TABLE `{table_name}` (\n    " + ",\n    ".join(lines) + "\n)"
+
+
+def mysql_string(value):
+    """Quote a string literal for MySQL (backslash is an escape character there)"""
+    return "'" + value.replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+class TableExporter:
+    """Write one table as bounded multi-row INSERT statements, streaming from a cursor"""
+
+    def __init__(self, out, images='inline', images_dir=IMAGES_EXPORT_DIR,
+                 batch_rows=BATCH_ROWS, batch_bytes=BATCH_BYTES, fetch_size=FETCH_SIZE):
+        self.out = out
+        self.images = images
+        self.images_dir = images_dir
+        self.batch_rows = batch_rows
+        self.batch_bytes = batch_bytes
+        self.fetch_size = fetch_size
 
-def check_database():
-    """Check the SQLite database structure and export it for MySQL conversion"""
-    
-    if not os.path.exists('employees.db'):
-        print("Error: employees.db file not found!")
+    def _write_blob(self, value):
+        if self.images == 'skip':
+            self.out.write('NULL')
+            return 4
+        if self.images == 'external':
+            # One file per distinct content; MySQL reads it back with LOAD_FILE()
+            os.makedirs(self.images_dir, exist_ok=True)
+            path = os.path.abspath(os.path.join(self.images_dir, hashlib.sha256(value).hexdigest() + '.bin'))
+            if not os.path.exists(path):
+                # Write then rename, so parallel shards never see a half-written file
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(value)
+                os.replace(tmp_path, path)
+            text = f"LOAD_FILE({mysql_string(path.replace(os.sep, '/'))})"
+            self.out.write(text)
+            return len(text)
+        if not value:
+            self.out.write("''")
+            return 2
+        self.out.write("X'")
+        view = memoryview(value)
+        for start in range(0, len(view), HEX_CHUNK):
+            self.out.write(view[start:start + HEX_CHUNK].hex())
+        self.out.write("'")
+        return 3 + 2 * len(value)
+
+    def _write_row(self, row):
+        written = 1
+        self.out.write('(')
+        for i, value in enumerate(row):
+            if i:
+                self.out.write(', ')
+                written += 2
+            if value is None:
+                text = 'NULL'
+            elif isinstance(value, bytes):
+                written += self._write_blob(value)
+                continue
+            elif isinstance(value, str):
+                text = mysql_string(value)
+            else:
+                text = str(value)
+            self.out.write(text)
+            written += len(text)
+        self.out.write(')')
+        return written + 1
+
+    def export(self, cursor, table_name, column_names, where='', params=()):
+        """Stream `SELECT * FROM table [WHERE ...]` into INSERT batches; returns rows written"""
+        header = f"INSERT INTO `{table_name}` (`{'`, `'.join(column_names)}`) VALUES\n"
+        cursor.execute(f"SELECT * FROM {table_name} {where} ORDER BY rowid", params)
+        total = 0
+        in_batch = 0
+        batch_size = 0
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            for row in rows:
+                if in_batch and (in_batch >= self.batch_rows or batch_size >= self.batch_bytes):
+                    self.out.write(';\n')
+                    in_batch = 0
+                if in_batch == 0:
+                    self.out.write(header)
+                    batch_size = len(header)
+                else:
+                    self.out.write(',\n')
+                batch_size += self._write_row(row)
+                in_batch += 1
+                total += 1
+        if in_batch:
+            self.out.write(';\n')
+        return total
+
+
+def connect_readonly(db_file=DB_FILE):
+    """Open a read-only connection, as used by the parallel workers"""
+    return sqlite3.connect(pathlib.Path(db_file).resolve().as_uri() + '?mode=ro', uri=True)
+
+
+def describe_table(cursor, table_name):
+    """Return the analysis text for one table: schema, row count and sample rows"""
+    lines = [f"\nTable: {table_name}"]
+
+    # Get table schema
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = cursor.fetchall()
+
+    lines.append("Columns:")
+    for col in columns:
+        col_id, name, data_type, not_null, default_val, primary_key = col
+        pk_str = " PRIMARY KEY" if primary_key else ""
+        not_null_str = " NOT NULL" if not_null else ""
+        default_str = f" DEFAULT {default_val}" if default_val else ""
+        lines.append(f"  - {name}: {data_type}{not_null_str}{default_str}{pk_str}")
+
+    # Get row count
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+    row_count = cursor.fetchone()[0]
+    lines.append(f"Row count: {row_count}")
+
+    # Show sample data (first 3 rows), with BLOBs summarized
+    if row_count > 0:
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
+        sample_data = cursor.fetchall()
+        lines.append("Sample data:")
+        for i, row in enumerate(sample_data, 1):
+            row = tuple(f"<{len(v)} bytes>" if isinstance(v, bytes) else v for v in row)
+            lines.append(f"  Row {i}: {row}")
+    return "\n".join(lines)
+
+
+def plan_shards(cursor, table_name, shard_rows=SHARD_ROWS):
+    """Split a table into rowid ranges of roughly `shard_rows` rows; [None] means one piece"""
+    cursor.execute(f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM {table_name}")
+    low, high, count = cursor.fetchone()
+    if count <= shard_rows:
+        return [None]
+    pieces = math.ceil(count / shard_rows)
+    width = math.ceil((high - low + 1) / pieces)
+    return [(start, min(high, start + width - 1)) for start in range(low, high + 1, width)]
+
+
+def _analyze_task(db_file, table_name):
+    started = time.perf_counter()
+    conn = connect_readonly(db_file)
+    try:
+        text = describe_table(conn.cursor(), table_name)
+    finally:
+        conn.close()
+    return text, time.perf_counter() - started
+
+
+def _export_task(db_file, table_name, column_names, bounds, part_path, options):
+    """Export one table or rowid range to its own part file; returns (rows, seconds)"""
+    started = time.perf_counter()
+    conn = connect_readonly(db_file)
+    try:
+        with open(part_path, 'w', encoding='utf-8') as out:
+            exporter = TableExporter(out, **options)
+            if bounds is None:
+                rows = exporter.export(conn.cursor(), table_name, column_names)
+            else:
+                rows = exporter.export(conn.cursor(), table_name, column_names,
+                                       'WHERE rowid BETWEEN ? AND ?', bounds)
+    finally:
+        conn.close()
+    return rows, time.perf_counter() - started
+
+
+def parallel_check(tables, output, compress, options, jobs=None, shard_rows=SHARD_ROWS):
+    """Analyze and export every table (or rowid shard of a big table) in a process pool.
+
+    Each worker uses its own read-only connection and writes a part file;
+    the parts are then concatenated in table/shard order, so the dump is
+    the same whatever order the workers finish in. Workers read in separate
+    transactions, so run this while nothing is writing to the database.
+    """
+    conn = connect_readonly(DB_FILE)
+    cursor = conn.cursor()
+    skipped = ('images',) if options['images'] == 'skip' else ()
+    schemas = [mysql_schema(cursor, table_name, skipped) for table_name, _ in tables]
+    columns = {}
+    shards = {}
+    for table_name, _ in tables:
+        cursor.execute(f"PRAGMA table_info({table_name})")
+        columns[table_name] = [col[1] for col in cursor.fetchall()]
+        skip = options['images'] == 'skip' and table_name == 'images'
+        shards[table_name] = [] if skip else plan_shards(cursor, table_name, shard_rows)
+    conn.close()
+
+    work_dir = tempfile.mkdtemp(prefix='export_', dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            analyses = {table_name: pool.submit(_analyze_task, DB_FILE, table_name) for table_name, _ in tables}
+            parts = {}
+            for table_name, _ in tables:
+                for index, bounds in enumerate(shards[table_name]):
+                    part_path = os.path.join(work_dir, f"{table_name}.{index:05d}.sql")
+                    future = pool.submit(_export_task, DB_FILE, table_name, columns[table_name],
+                                         bounds, part_path, options)
+                    parts[future] = (table_name, index, part_path)
+
+            # Analysis is printed in table order once it is all available
+            for table_name, _ in tables:
+                text, seconds = analyses[table_name].result()
+                print(text)
+                print(f"(analyzed in {seconds:.2f}s)")
+
+            print("\n" + "=" * 60)
+            print(f"Exporting database for MySQL conversion ({len(parts)} shard(s))...")
+            totals = {table_name: 0 for table_name, _ in tables}
+            for future in as_completed(parts):
+                table_name, index, _ = parts[future]
+                rows, seconds = future.result()
+                totals[table_name] += rows
+                print(f"  {table_name} shard {index + 1}/{len(shards[table_name])}: {rows} row(s) in {seconds:.2f}s")
+
+        # Stitch the parts together in a fixed order
+        ordered = sorted(parts.values())
+        with open_output(output, compress) as f:
+            f.write("-- MySQL Database Export from SQLite\n")
+            f.write("-- Generated automatically\n\n")
+            for schema in schemas:
+                f.write(schema + ";\n\n")
+            for table_name, _ in tables:
+                if not shards[table_name]:
+                    continue
+                f.write(f"-- Data for table `{table_name}`\n")
+                for part_table, _, part_path in ordered:
+                    if part_table == table_name:
+                        with open(part_path, encoding='utf-8') as part:
+                            shutil.copyfileobj(part, f)
+                f.write("\n")
+        for table_name, _ in tables:
+            print(f"  {table_name}: {totals[table_name]} row(s)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def open_output(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def check_database(output=EXPORT_FILE, compress=False, images='inline', images_dir=IMAGES_EXPORT_DIR,
+                   batch_rows=BATCH_ROWS, fetch_size=FETCH_SIZE, jobs=1, shard_rows=SHARD_ROWS):
+    """Check the SQLite database structure and export it for MySQL conversion.
+
+    The export is streamed: rows are read with fetchmany() and written as
+    INSERT statements of at most `batch_rows` rows / BATCH_BYTES bytes, so
+    memory use does not grow with the database. BLOBs are written as hex
+    literals, left out (images='skip') or saved as files loaded back with
+    LOAD_FILE() (images='external').
+
+    With jobs other than 1, tables and id-range shards of large tables are
+    analyzed and exported in parallel (jobs=None uses every CPU).
+    """
+
+    if not os.path.exists(DB_FILE):
+        print(f"Error: {DB_FILE} file not found!")
         return
-    
+
     try:
         # Connect to the SQLite database
-        conn = sqlite3.connect('employees.db')
+        conn = sqlite3.connect(DB_FILE)
         cursor = conn.cursor()
-        
+
         print("=== SQLite Database Analysis ===")
-        print(f"Database file: employees.db")
-        print(f"File size: {os.path.getsize('employees.db')} bytes")
+        print(f"Database file: {DB_FILE}")
+        print(f"File size: {os.path.getsize(DB_FILE)} bytes")
         print()
-        
+
         # Get all table names
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        
+        tables = exportable_tables(cursor)
+
         if not tables:
             print("No tables found in the database.")
             return
-        
+
         print(f"Found {len(tables)} table(s):")
         print("-" * 50)
-        
+
+        if jobs != 1:
+            conn.close()
+            options = dict(images=images, images_dir=images_dir, batch_rows=batch_rows, fetch_size=fetch_size)
+            parallel_check(tables, output, compress, options, jobs, shard_rows)
+            print(f"✓ Database exported to '{output}'")
+            print("✓ This file is ready for import into MySQL")
+            return
+
         # Analyze each table
-        for table in tables:
-            table_name = table[0]
-            print(f"\nTable: {table_name}")
-            
-            # Get table schema
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            
-            print("Columns:")
-            for col in columns:
-                col_id, name, data_type, not_null, default_val, primary_key = col
-                pk_str = " PRIMARY KEY" if primary_key else ""
-                not_null_str = " NOT NULL" if not_null else ""
-                default_str = f" DEFAULT {default_val}" if default_val else ""
-                print(f"  - {name}: {data_type}{not_null_str}{default_str}{pk_str}")
-            
-            # Get row count
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            row_count = cursor.fetchone()[0]
-            print(f"Row count: {row_count}")
-            
-            # Show sample data (first 3 rows)
-            if row_count > 0:
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
-                sample_data = cursor.fetchall()
-                print("Sample data:")
-                for i, row in enumerate(sample_data, 1):
-                    print(f"  Row {i}: {row}")
-        
+        for table_name, _ in tables:
+            print(describe_table(cursor, table_name))
+
         # Export schema and data for MySQL conversion
         print("\n" + "=" * 60)
         print("Exporting database for MySQL conversion...")
-        
-        # Get all SQL statements
-        cursor.execute("SELECT sql FROM sqlite_master WHERE type='table'")
-        table_schemas = cursor.fetchall()
-        
-        with open('employees_mysql_export.sql', 'w', encoding='utf-8') as f:
+
+        with open_output(output, compress) as f:
             f.write("-- MySQL Database Export from SQLite\n")
             f.write("-- Generated automatically\n\n")
-            
+
             # Write table creation statements
-            for schema in table_schemas:
-                if schema[0]:  # schema[0] contains the CREATE TABLE statement
-                    sql = schema[0]
-                    # Convert SQLite syntax to MySQL syntax
-                    sql = sql.replace('AUTOINCREMENT', 'AUTO_INCREMENT')
-                    sql = sql.replace('INTEGER PRIMARY KEY', 'INT AUTO_INCREMENT PRIMARY KEY')
-                    sql = sql.replace('WITHOUT ROWID', '')
-                    # Replace double quotes with backticks for identifiers
-                    import re
-                    sql = re.sub(r'"([^"]+)"', r'`\1`', sql)
-                    f.write(sql + ";\n\n")
-            
-            # Export data
-            for table in tables:
-                table_name = table[0]
-                cursor.execute(f"SELECT * FROM {table_name}")
-                rows = cursor.fetchall()
-                
-                if rows:
-                    # Get column names
-                    cursor.execute(f"PRAGMA table_info({table_name})")
-                    columns = cursor.fetchall()
-                    column_names = [col[1] for col in columns]
-                    
-                    f.write(f"-- Data for table `{table_name}`\n")
-                    f.write(f"INSERT INTO `{table_name}` (`{'`, `'.join(column_names)}`) VALUES\n")
-                    
-                    for i, row in enumerate(rows):
-                        # Convert row data to MySQL format
-                        formatted_row = []
-                        for value in row:
-                            if value is None:
-                                formatted_row.append('NULL')
-                            elif isinstance(value, str):
-                                # Escape single quotes and wrap in quotes
-                                escaped_value = value.replace("'", "''")
-                                formatted_row.append(f"'{escaped_value}'")
-                            else:
-                                formatted_row.append(str(value))
-                        
-                        row_str = f"({', '.join(formatted_row)})"
-                        if i < len(rows) - 1:
-                            row_str += ","
-                        f.write(f"{row_str}\n")
-                    
-                    f.write(";\n\n")
-        
-        print("✓ Database exported to 'employees_mysql_export.sql'")
+            skipped = ('images',) if images == 'skip' else ()
+            for table_name, _ in tables:
+                f.write(mysql_schema(cursor, table_name, skipped) + ";\n\n")
+
+            # Export data, one bounded INSERT batch at a time
+            exporter = TableExporter(f, images=images, images_dir=images_dir,
+                                     batch_rows=batch_rows, fetch_size=fetch_size)
+            for table_name, _ in tables:
+                if images == 'skip' and table_name == 'images':
+                    continue
+                cursor.execute(f"PRAGMA table_info({table_name})")
+                column_names = [col[1] for col in cursor.fetchall()]
+
+                f.write(f"-- Data for table `{table_name}`\n")
+                count = exporter.export(cursor, table_name, column_names)
+                f.write("\n")
+                print(f"  {table_name}: {count} row(s)")
+
+        print(f"✓ Database exported to '{output}'")
         print("✓ This file is ready for import into MySQL")
-        
+
         conn.close()
-        
+
     except Exception as e:
         print(f"Error: {e}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze employees.db and export it as MySQL SQL")
+    parser.add_argument('--output', '-o', default=None, help=f"output file (default: {EXPORT_FILE}[.gz])")
+    parser.add_argument('--gzip', action='store_true', help="write gzip-compressed output")
+    parser.add_argument('--images', choices=('inline', 'skip', 'external'), default='inline',
+                        help="inline BLOBs as hex, skip them, or write them to --images-dir and use LOAD_FILE()")
+    parser.add_argument('--images-dir', default=IMAGES_EXPORT_DIR)
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="worker processes for per-table/per-shard export (0 = all CPUs)")
+    parser.add_argument('--shard-rows', type=int, default=SHARD_ROWS,
+                        help="split tables larger than this into id-range shards when --jobs is used")
+    args = parser.parse_args()
+    output = args.output or (EXPORT_FILE + '.gz' if args.gzip else EXPORT_FILE)
+    check_database(output, compress=args.gzip or output.endswith('.gz'), images=args.images,
+                   images_dir=args.images_dir, batch_rows=args.batch_rows,
+                   jobs=args.jobs or None, shard_rows=args.shard_rows)
+
+
 if __name__ == "__main__":
-    check_database() 
\ No newline at end of file
+    main()
@@ -0,0 +1,1175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data access layer for the Employee & Product Management System.
+
+All SQLite access from the GUI goes through this module. Each thread gets
+one long-lived connection, configured once with WAL journaling,
+synchronous=NORMAL and a busy timeout, instead of opening a new
+connection for every button click.
+"""
+
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+DB_PATH = "employees.db"
+IMAGES_DIR = "images"
+BUSY_TIMEOUT_MS = 5000
+# Tables whose row changes are recorded in change_log by triggers
+TRACKED_TABLES = ("employees", "categories", "products", "departments")
+# How many change_log entries to keep when pruning
+CHANGE_LOG_KEEP = 10000
+# Largest image accepted, as uploaded and as stored
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Maximum number of ranked results returned by a product search
+SEARCH_LIMIT = 500
+
+# Arabic diacritics (tashkeel), tatweel and letter variants folded away before
+# indexing and searching, so "أحمد" and "احمد" match each other
+_ARABIC_FOLD = {chr(c): "" for c in range(0x064B, 0x0653)}
+_ARABIC_FOLD.update({"\u0640": "", "أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_FOLD_TABLE = str.maketrans(_ARABIC_FOLD)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image is bigger than MAX_IMAGE_BYTES"""
+
+    def __init__(self, size):
+        super().__init__(
+            f"Image is {size / 1048576:.1f} MB; the limit is {MAX_IMAGE_BYTES / 1048576:.0f} MB"
+        )
+        self.size = size
+
+
+class Employee(NamedTuple):
+    id: int
+    name: str
+    email: str
+    department: str
+
+
+class Product(NamedTuple):
+    id: int
+    name: str
+    category: str
+    price: float
+    quantity: int
+
+
+class Category(NamedTuple):
+    id: int
+    name: str
+
+
+class CategoryStats(NamedTuple):
+    category_id: int
+    category: str
+    product_count: int
+    total_quantity: int
+    stock_value: float
+    low_stock: int
+
+
+# --- Connection pool (one connection per thread) ---
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []
+# Called with each new connection (see add_connection_hook)
+_connection_hooks = []
+
+
+def _configure(conn):
+    """Apply the per-connection settings once, when the connection is opened"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+
+
+def get_connection():
+    """Return the calling thread's connection, opening it on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        _configure(conn)
+        _local.conn = conn
+        with _pool_lock:
+            _pool.append(conn)
+            hooks = list(_connection_hooks)
+        for hook in hooks:
+            hook(conn)
+    return conn
+
+
+def add_connection_hook(hook):
+    """Call hook(conn) on every pooled connection, now and whenever one is opened"""
+    with _pool_lock:
+        _connection_hooks.append(hook)
+        connections = list(_pool)
+    for conn in connections:
+        hook(conn)
+
+
+@contextmanager
+def transaction():
+    """Run a block of writes as one IMMEDIATE transaction on this thread's connection"""
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def close_all():
+    """Commit and close every pooled connection (called on application exit)"""
+    with _pool_lock:
+        connections = list(_pool)
+        _pool.clear()
+    for conn in connections:
+        try:
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error closing connection: {e}")
+    _local.__dict__.clear()
+
+
+# --- Schema ---
+def init_db():
+    """Create the tables and change-tracking triggers if they do not exist yet"""
+    conn = get_connection()
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            department TEXT NOT NULL
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity INTEGER NOT NULL,
+            image_blob BLOB
+        )
+        """)
+    _migrate(conn)
+    with conn:
+        _create_change_log(conn)
+        _create_search_index(conn)
+        _create_image_triggers(conn)
+        _create_inventory_triggers(conn)
+        _ensure_unique_email(conn)
+    prune_change_log()
+    # إنشاء مجلد الصور إذا لم يكن موجودًا
+    if not os.path.exists(IMAGES_DIR):
+        os.makedirs(IMAGES_DIR)
+
+
+# --- Migrations ---
+def image_hash(data):
+    """Content hash used as the key of the images table"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _migrate_image_store(conn):
+    """Move inline products.image_blob data into a content-addressed images table"""
+    conn.execute("""
+    CREATE TABLE images (
+        hash TEXT PRIMARY KEY,
+        data BLOB NOT NULL,
+        size INTEGER NOT NULL
+    )
+    """)
+    conn.execute("ALTER TABLE products ADD COLUMN image_hash TEXT REFERENCES images(hash)")
+    conn.execute("CREATE INDEX idx_products_image_hash ON products (image_hash)")
+    conn.create_function("image_hash", 1, image_hash, deterministic=True)
+    conn.execute("""
+    INSERT OR IGNORE INTO images (hash, data, size)
+    SELECT image_hash(image_blob), image_blob, length(image_blob)
+    FROM products WHERE image_blob IS NOT NULL
+    """)
+    conn.execute("UPDATE products SET image_hash = image_hash(image_blob), image_blob = NULL WHERE image_blob IS NOT NULL")
+    try:
+        conn.execute("ALTER TABLE products DROP COLUMN image_blob")
+    except sqlite3.OperationalError:
+        # SQLite older than 3.35 cannot drop columns; the column is left empty
+        pass
+
+
+def _migrate_thumbnails(conn):
+    """Add a precomputed thumbnail column to the images table"""
+    conn.execute("ALTER TABLE images ADD COLUMN thumb BLOB")
+
+
+def _rebuild_table(conn, table, create_sql, copy_sql):
+    """Replace `table` by a new definition, keeping row ids and the AUTOINCREMENT counter"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+    conn.execute(create_sql.format(table=f"{table}_new"))
+    conn.execute(copy_sql.format(table=f"{table}_new"))
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if row:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name=?", (row[0], table))
+
+
+def _migrate_normalized_schema(conn):
+    """Reference categories and departments by id, with foreign keys and indexes"""
+    # Every category and department text in use becomes a real row first
+    conn.execute("INSERT OR IGNORE INTO categories (name) SELECT DISTINCT category FROM products")
+    conn.execute("""
+    CREATE TABLE departments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO departments (name) SELECT DISTINCT department FROM employees")
+
+    _rebuild_table(conn, "products", """
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE RESTRICT,
+        price REAL NOT NULL,
+        quantity INTEGER NOT NULL,
+        image_hash TEXT REFERENCES images(hash)
+    )
+    """, """
+    INSERT INTO {table} (id, name, category_id, price, quantity, image_hash)
+    SELECT p.id, p.name, c.id, p.price, p.quantity, p.image_hash
+    FROM products p JOIN categories c ON c.name = p.category
+    """)
+    _rebuild_table(conn, "employees", """
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        department_id INTEGER NOT NULL REFERENCES departments(id) ON DELETE RESTRICT
+    )
+    """, """
+    INSERT INTO {table} (id, name, email, department_id)
+    SELECT e.id, e.name, e.email, d.id
+    FROM employees e JOIN departments d ON d.name = e.department
+    """)
+
+    # Columns the views filter, join and sort on
+    conn.execute("CREATE INDEX idx_products_category ON products (category_id)")
+    conn.execute("CREATE INDEX idx_products_name ON products (name)")
+    conn.execute("CREATE INDEX idx_products_price ON products (price)")
+    conn.execute("CREATE INDEX idx_products_quantity ON products (quantity)")
+    conn.execute("CREATE INDEX idx_products_image_hash ON products (image_hash)")
+    conn.execute("CREATE INDEX idx_employees_name ON employees (name)")
+    conn.execute("CREATE INDEX idx_employees_department ON employees (department_id)")
+
+
+def _migrate_inventory_summary(conn):
+    """Keep per-category product counts, stock and stock value in a summary table"""
+    conn.execute("""
+    CREATE TABLE category_stats (
+        category_id INTEGER PRIMARY KEY REFERENCES categories(id) ON DELETE CASCADE,
+        product_count INTEGER NOT NULL DEFAULT 0,
+        total_quantity INTEGER NOT NULL DEFAULT 0,
+        stock_value REAL NOT NULL DEFAULT 0,
+        low_stock INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    # Filled and hooked up in the same transaction, so no write slips in between
+    conn.execute(_INVENTORY_FILL_SQL)
+    _create_inventory_triggers(conn)
+
+
+def _migrate_sort_indexes(conn):
+    """Add composite indexes for sorted and filtered table views"""
+    # A facet on category or department plus a sort column is one index range;
+    # the new indexes start with the foreign key, so the old ones are redundant
+    conn.execute("CREATE INDEX idx_products_category_name ON products (category_id, name)")
+    conn.execute("CREATE INDEX idx_products_category_price ON products (category_id, price)")
+    conn.execute("CREATE INDEX idx_products_category_quantity ON products (category_id, quantity)")
+    conn.execute("CREATE INDEX idx_employees_department_name ON employees (department_id, name)")
+    conn.execute("DROP INDEX idx_products_category")
+    conn.execute("DROP INDEX idx_employees_department")
+
+
+def _migrate_image_original_size(conn):
+    """Record the size of each image before it was downscaled and recompressed"""
+    # NULL: stored as uploaded, before the ingestion pipeline existed
+    conn.execute("ALTER TABLE images ADD COLUMN original_size INTEGER")
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how many
+# of them a database file has already been through.
+MIGRATIONS = [
+    _migrate_image_store,
+    _migrate_thumbnails,
+    _migrate_normalized_schema,
+    _migrate_inventory_summary,
+    _migrate_sort_indexes,
+    _migrate_image_original_size,
+]
+
+
+def _migrate(conn):
+    """Bring an existing database up to the current schema, one migration at a time"""
+    # Table rebuilds must not trigger foreign key actions; the pragma only
+    # takes effect outside a transaction
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            _apply_migration(conn, number, migration)
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+
+def _apply_migration(conn, number, migration):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read inside the write lock in case another instance migrated first
+        if conn.execute("PRAGMA user_version").fetchone()[0] < number:
+            print(f"Migrating database: {migration.__doc__}")
+            migration(conn)
+            problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if problems:
+                raise sqlite3.IntegrityError(f"Migration {number} left broken references: {problems[:5]}")
+            conn.execute(f"PRAGMA user_version={number}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _create_image_triggers(conn):
+    """Drop stored images once no product references them"""
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_image_release AFTER DELETE ON products
+    WHEN OLD.image_hash IS NOT NULL
+    BEGIN
+        DELETE FROM images WHERE hash = OLD.image_hash
+        AND NOT EXISTS (SELECT 1 FROM products WHERE image_hash = OLD.image_hash);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_image_replace AFTER UPDATE OF image_hash ON products
+    WHEN OLD.image_hash IS NOT NULL
+    BEGIN
+        DELETE FROM images WHERE hash = OLD.image_hash
+        AND NOT EXISTS (SELECT 1 FROM products WHERE image_hash = OLD.image_hash);
+    END
+    """)
+
+
+# Products with this quantity or less count as low stock
+LOW_STOCK_QUANTITY = 5
+
+# category_stats rows computed from scratch (full scan of products)
+_INVENTORY_SCAN_SQL = f"""
+SELECT category_id, COUNT(*), SUM(quantity), TOTAL(price * quantity), SUM(quantity <= {LOW_STOCK_QUANTITY})
+FROM products GROUP BY category_id
+"""
+_INVENTORY_FILL_SQL = (
+    "INSERT INTO category_stats (category_id, product_count, total_quantity, stock_value, low_stock)"
+    + _INVENTORY_SCAN_SQL
+)
+
+
+def _inventory_delta(row, sign):
+    """SET clause adding (sign=+) or removing (sign=-) one product row from its category"""
+    return f"""
+        product_count = product_count {sign} 1,
+        total_quantity = total_quantity {sign} {row}.quantity,
+        stock_value = stock_value {sign} {row}.price * {row}.quantity,
+        low_stock = low_stock {sign} ({row}.quantity <= {LOW_STOCK_QUANTITY})
+    """
+
+
+def _create_inventory_triggers(conn):
+    """Maintain category_stats incrementally on every product insert, update and delete"""
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_insert AFTER INSERT ON products
+    BEGIN
+        INSERT OR IGNORE INTO category_stats (category_id) VALUES (NEW.category_id);
+        UPDATE category_stats SET {_inventory_delta("NEW", "+")} WHERE category_id = NEW.category_id;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_delete AFTER DELETE ON products
+    BEGIN
+        UPDATE category_stats SET {_inventory_delta("OLD", "-")} WHERE category_id = OLD.category_id;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_update AFTER UPDATE OF category_id, price, quantity ON products
+    BEGIN
+        UPDATE category_stats SET {_inventory_delta("OLD", "-")} WHERE category_id = OLD.category_id;
+        INSERT OR IGNORE INTO category_stats (category_id) VALUES (NEW.category_id);
+        UPDATE category_stats SET {_inventory_delta("NEW", "+")} WHERE category_id = NEW.category_id;
+    END
+    """)
+
+
+def _ensure_unique_email(conn):
+    """Make employee emails unique (case-insensitively) once the data allows it"""
+    row = conn.execute("SELECT \"unique\" FROM pragma_index_list('employees') WHERE name='idx_employees_email'").fetchone()
+    if row and row[0]:
+        return
+    duplicates = [r[0] for r in conn.execute(
+        "SELECT email FROM employees GROUP BY email COLLATE NOCASE HAVING COUNT(*) > 1 LIMIT 5")]
+    if duplicates:
+        # Keep lookups fast anyway; the unique index is created once the duplicates are fixed
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_employees_email ON employees (email COLLATE NOCASE)")
+        print(f"Warning: duplicate employee emails, cannot enforce uniqueness: {', '.join(duplicates)}")
+        return
+    conn.execute("DROP INDEX IF EXISTS idx_employees_email")
+    conn.execute("CREATE UNIQUE INDEX idx_employees_email ON employees (email COLLATE NOCASE)")
+
+
+def _create_change_log(conn):
+    """Record every row change on the tracked tables, for cheap change detection"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        row_id INTEGER NOT NULL
+    )
+    """)
+    for table in TRACKED_TABLES:
+        for event, ref in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_log AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO change_log (tbl, row_id) VALUES ('{table}', {ref}.id);
+            END
+            """)
+
+
+def fold_text(text):
+    """Apply the Arabic normalization used by the search index"""
+    return text.translate(_FOLD_TABLE)
+
+
+def _fold_sql(expr):
+    """SQL expression applying fold_text(), usable inside triggers in any process"""
+    for src, dst in _ARABIC_FOLD.items():
+        expr = f"replace({expr}, '{src}', '{dst}')"
+    return expr
+
+
+def _create_search_index(conn):
+    """FTS5 index over product name and category, kept in sync by triggers"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='products_fts'").fetchone()
+    if not exists:
+        conn.execute("""
+        CREATE VIRTUAL TABLE products_fts USING fts5(
+            name, category,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """)
+        conn.execute(f"""
+        INSERT INTO products_fts (rowid, name, category)
+        SELECT p.id, {_fold_sql("p.name")}, {_fold_sql("c.name")}
+        FROM products p JOIN categories c ON c.id = p.category_id
+        """)
+    category = "(SELECT name FROM categories WHERE id = NEW.category_id)"
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts (rowid, name, category)
+        VALUES (NEW.id, {_fold_sql("NEW.name")}, {_fold_sql(category)});
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, category_id ON products
+    BEGIN
+        UPDATE products_fts SET name = {_fold_sql("NEW.name")}, category = {_fold_sql(category)}
+        WHERE rowid = NEW.id;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS categories_fts_rename AFTER UPDATE OF name ON categories
+    BEGIN
+        UPDATE products_fts SET category = {_fold_sql("NEW.name")}
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = NEW.id);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products
+    BEGIN
+        DELETE FROM products_fts WHERE rowid = OLD.id;
+    END
+    """)
+
+
+# --- Change detection ---
+def data_version():
+    """PRAGMA data_version: changes whenever another connection commits"""
+    return get_connection().execute("PRAGMA data_version").fetchone()[0]
+
+
+def change_seq():
+    """Sequence number of the latest recorded change (0 if none)"""
+    return get_connection().execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+def changes_since(seq):
+    """Return {table: latest seq} for every tracked table changed after `seq`"""
+    cur = get_connection().execute(
+        "SELECT tbl, MAX(seq) FROM change_log WHERE seq > ? GROUP BY tbl", (seq,)
+    )
+    return dict(cur.fetchall())
+
+
+def changed_rows(seq):
+    """Return ({table: set of row ids changed after `seq`}, latest seq).
+
+    Returns None if pruning already removed some of those changes.
+    """
+    conn = get_connection()
+    oldest = conn.execute("SELECT MIN(seq) FROM change_log").fetchone()[0]
+    if oldest is not None and oldest > seq + 1:
+        return None
+    changed, latest = {}, seq
+    for latest, table, row_id in conn.execute("SELECT seq, tbl, row_id FROM change_log WHERE seq > ? ORDER BY seq", (seq,)):
+        changed.setdefault(table, set()).add(row_id)
+    return changed, latest
+
+
+def prune_change_log(keep=CHANGE_LOG_KEEP, before=None):
+    """Delete all but the latest `keep` entries, and none after seq `before` if given"""
+    conn = get_connection()
+    cutoff = conn.execute("SELECT MAX(seq) FROM change_log").fetchone()[0]
+    if cutoff is None:
+        return
+    cutoff -= keep
+    if before is not None:
+        cutoff = min(cutoff, before)
+    with conn:
+        conn.execute("DELETE FROM change_log WHERE seq <= ?", (cutoff,))
+
+
+class ChangeWatcher:
+    """Tell which tracked tables other connections modified since the last poll"""
+
+    def __init__(self):
+        self.version = data_version()
+        self.seq = change_seq()
+
+    def poll(self):
+        """Return the set of changed table names; costs one PRAGMA when idle"""
+        version = data_version()
+        if version == self.version:
+            return set()
+        self.version = version
+        changed = changes_since(self.seq)
+        if changed:
+            self.seq = max(changed.values())
+        return set(changed)
+
+
+def _page(after_id, limit):
+    """Keyset pagination parameters; LIMIT -1 means no limit in SQLite"""
+    return (0 if after_id is None else after_id, -1 if limit is None else limit)
+
+
+# --- Validation (shared by the forms and bulk import) ---
+def validate_employee(name, email, department):
+    """Return the cleaned employee fields or raise ValueError with the form's message"""
+    name, email, department = (str(v).strip() if v is not None else "" for v in (name, email, department))
+    if not (name and email and department):
+        raise ValueError("All fields are required.")
+    return name, email, department
+
+
+def validate_product(name, category, price, quantity):
+    """Return the cleaned product fields or raise ValueError with the form's message"""
+    try:
+        price = float(price)
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError("Price and quantity must be numbers.")
+    name, category = (str(v).strip() if v is not None else "" for v in (name, category))
+    if not (name and category):
+        raise ValueError("All fields are required.")
+    return name, category, price, quantity
+
+
+def _edit_value(fields, field, value):
+    """Validate a bulk-edit value for `field` and convert it to the column type"""
+    if field not in fields:
+        raise ValueError(f"Field '{field}' cannot be edited.")
+    try:
+        value = fields[field](str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid value for {field}.")
+    if value == "":
+        raise ValueError("All fields are required.")
+    return value
+
+
+def _rows_by_id(select, id_column, ids, chunk=500):
+    """Run `select ... WHERE id IN (...)` over ids in chunks below SQLite's parameter limit"""
+    ids = list(ids)
+    conn = get_connection()
+    rows = []
+    for start in range(0, len(ids), chunk):
+        part = ids[start:start + chunk]
+        marks = ",".join("?" * len(part))
+        rows.extend(conn.execute(f"{select} WHERE {id_column} IN ({marks}) ORDER BY {id_column}", part).fetchall())
+    return rows
+
+
+# Rows as shown in the tables: categories and departments by name
+EMPLOYEE_SELECT = "SELECT e.id, e.name, e.email, d.name FROM employees e JOIN departments d ON d.id = e.department_id"
+PRODUCT_SELECT = "SELECT p.id, p.name, c.name, p.price, p.quantity FROM products p JOIN categories c ON c.id = p.category_id"
+
+
+# Sortable columns: name -> (ORDER BY expression, row index) pairs; the id
+# always comes last so the order is total and pages can resume after a row.
+# Each ordering is read from an index, with or without the category/department
+# facet: the category and department sorts use the *_SORT_SELECTS below.
+EMPLOYEE_SORTS = {
+    "id": (),
+    "name": (("e.name", 1),),
+    "email": (("e.email COLLATE NOCASE", 2),),
+    "department": (("d.name", 3), ("e.name", 1)),
+}
+PRODUCT_SORTS = {
+    "id": (),
+    "name": (("p.name", 1),),
+    "category": (("c.name", 2), ("p.name", 1)),
+    "price": (("p.price", 3),),
+    "quantity": (("p.quantity", 4),),
+}
+# Sorts led by the category or department name walk that table's unique name
+# index and reach the rows through the (foreign key, name) index; CROSS JOIN
+# keeps SQLite from putting products/employees in the outer loop and sorting.
+EMPLOYEE_SORT_SELECTS = {
+    "department": "SELECT e.id, e.name, e.email, d.name FROM departments d CROSS JOIN employees e ON e.department_id = d.id",
+}
+PRODUCT_SORT_SELECTS = {
+    "category": "SELECT p.id, p.name, c.name, p.price, p.quantity FROM categories c CROSS JOIN products p ON p.category_id = c.id",
+}
+# Facet filters: name -> (SQL predicate, conversion of the value)
+EMPLOYEE_FACETS = {
+    "department": ("e.department_id = (SELECT id FROM departments WHERE name = ?)", str),
+}
+PRODUCT_FACETS = {
+    "category": ("p.category_id = (SELECT id FROM categories WHERE name = ?)", str),
+    "min_price": ("p.price >= ?", float),
+    "max_price": ("p.price <= ?", float),
+    "min_quantity": ("p.quantity >= ?", int),
+    "max_quantity": ("p.quantity <= ?", int),
+}
+
+
+def compile_filters(facets, filters):
+    """Turn {facet: value} into SQL predicates and parameters; empty values are ignored"""
+    where, params = [], []
+    for name, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        if name not in facets:
+            raise ValueError(f"Unknown filter: {name}")
+        predicate, convert = facets[name]
+        try:
+            params.append(convert(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {name}.")
+        where.append(predicate)
+    return where, params
+
+
+def _sorted_page(select, id_column, sorts, facets, filters, sort, descending, after, limit, sort_selects=None):
+    """Run `select` filtered and sorted, resuming after the row `after` (keyset pagination).
+
+    `sort_selects` maps sort columns to a select to use instead, with the
+    same columns but a join order that reads the rows in that order.
+    """
+    if sort not in sorts:
+        raise ValueError(f"Unknown sort column: {sort}")
+    keys = [expr for expr, _ in sorts[sort]] + [id_column]
+    where, params = compile_filters(facets, filters)
+    joined = sort_selects and sort in sort_selects
+    if joined:
+        select = sort_selects[sort]
+    if after is not None:
+        if joined:
+            # The row value spans both tables, so SQLite cannot start the outer
+            # loop from it; this bound on the leading name does
+            where.append(f"{keys[0]} {'<=' if descending else '>='} ?")
+            params.append(after[sorts[sort][0][1]])
+        # The collation goes on the parameter side; SQLite only uses an index
+        # for a row value comparison whose left side is bare columns
+        columns, marks = [], []
+        for key in keys:
+            column, _, collation = key.partition(" COLLATE ")
+            columns.append(column)
+            marks.append(f"? COLLATE {collation}" if collation else "?")
+        where.append(f"({', '.join(columns)}) {'<' if descending else '>'} ({', '.join(marks)})")
+        params.extend([after[index] for _, index in sorts[sort]] + [after[0]])
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY " + ", ".join(f"{key} DESC" if descending else key for key in keys) + " LIMIT ?"
+    params.append(-1 if limit is None else limit)
+    return get_connection().execute(sql, params).fetchall()
+
+
+# --- Employees ---
+def list_employees(after_id=None, limit=None):
+    """Employees ordered by id; pass after_id/limit to read one keyset page"""
+    return list(iter_employees(after_id, limit))
+
+
+def iter_employees(after_id=None, limit=None):
+    """Same rows as list_employees, yielded as the cursor reads them"""
+    cur = get_connection().execute(
+        f"{EMPLOYEE_SELECT} WHERE e.id > ? ORDER BY e.id LIMIT ?",
+        _page(after_id, limit),
+    )
+    return map(Employee._make, cur)
+
+
+def query_employees(filters=None, sort="id", descending=False, after=None, limit=None):
+    """Employees matching the facet filters, in the given order.
+
+    Pass the last row of a page as `after` to read the next one.
+    """
+    rows = _sorted_page(EMPLOYEE_SELECT, "e.id", EMPLOYEE_SORTS, EMPLOYEE_FACETS,
+                        filters, sort, descending, after, limit, EMPLOYEE_SORT_SELECTS)
+    return [Employee._make(row) for row in rows]
+
+
+def add_employee(name, email, department):
+    """Insert an employee and return its new row.
+
+    The department is created if needed; raises sqlite3.IntegrityError if
+    the email is already used.
+    """
+    conn = get_connection()
+    with conn:
+        ensure_departments(conn, (department,))
+        cur = conn.execute(
+            "INSERT INTO employees (name, email, department_id) VALUES (?, ?, (SELECT id FROM departments WHERE name=?))",
+            (name, email, department),
+        )
+    return Employee(cur.lastrowid, name, email, department)
+
+
+def insert_employees(conn, rows):
+    """Insert many validated (name, email, department) rows in the caller's transaction"""
+    ensure_departments(conn, {row[2] for row in rows})
+    conn.executemany(
+        "INSERT INTO employees (name, email, department_id) VALUES (?, ?, (SELECT id FROM departments WHERE name=?))",
+        rows,
+    )
+
+
+def existing_emails(conn, emails):
+    """Which of `emails` (compared case-insensitively) are already used"""
+    emails = [email.lower() for email in emails]
+    found = set()
+    for start in range(0, len(emails), 500):
+        part = emails[start:start + 500]
+        marks = ",".join("?" * len(part))
+        cur = conn.execute(f"SELECT lower(email) FROM employees WHERE email COLLATE NOCASE IN ({marks})", part)
+        found.update(row[0] for row in cur)
+    return found
+
+
+def ensure_departments(conn, names):
+    """Create any of `names` that do not exist yet, in the caller's transaction"""
+    conn.executemany("INSERT OR IGNORE INTO departments (name) VALUES (?)", ((name,) for name in names))
+
+
+def department_names():
+    cur = get_connection().execute("SELECT name FROM departments ORDER BY name")
+    return [row[0] for row in cur.fetchall()]
+
+
+def delete_employees(ids):
+    """Delete several employees in one transaction"""
+    with transaction() as conn:
+        conn.executemany("DELETE FROM employees WHERE id=?", ((i,) for i in ids))
+
+
+def get_employees(ids):
+    """Current rows for the given ids (missing ids are skipped)"""
+    return [Employee._make(row) for row in _rows_by_id(EMPLOYEE_SELECT, "e.id", ids)]
+
+
+# Columns the bulk editor may change, with the conversion applied to the new value
+EMPLOYEE_EDIT_FIELDS = {"department": str}
+_EMPLOYEE_ASSIGN = {"department": "department_id=(SELECT id FROM departments WHERE name=?)"}
+
+
+def update_employees(ids, field, value):
+    """Set one field on several employees in one transaction; returns the updated rows"""
+    value = _edit_value(EMPLOYEE_EDIT_FIELDS, field, value)
+    with transaction() as conn:
+        ensure_departments(conn, (value,))
+        conn.executemany(f"UPDATE employees SET {_EMPLOYEE_ASSIGN[field]} WHERE id=?", ((value, i) for i in ids))
+    return get_employees(ids)
+
+
+# --- Products ---
+def list_products(after_id=None, limit=None):
+    """Products ordered by id; pass after_id/limit to read one keyset page"""
+    return list(iter_products(after_id, limit))
+
+
+def iter_products(after_id=None, limit=None):
+    """Same rows as list_products, yielded as the cursor reads them"""
+    cur = get_connection().execute(
+        f"{PRODUCT_SELECT} WHERE p.id > ? ORDER BY p.id LIMIT ?",
+        _page(after_id, limit),
+    )
+    return map(Product._make, cur)
+
+
+def query_products(filters=None, sort="id", descending=False, after=None, limit=None):
+    """Products matching the facet filters, in the given order.
+
+    Pass the last row of a page as `after` to read the next one.
+    """
+    rows = _sorted_page(PRODUCT_SELECT, "p.id", PRODUCT_SORTS, PRODUCT_FACETS,
+                        filters, sort, descending, after, limit, PRODUCT_SORT_SELECTS)
+    return [Product._make(row) for row in rows]
+
+
+def product_records(ids=None):
+    """Cursor over (id, name, category id, price, quantity) of every product, or of `ids`, ordered by id"""
+    select = "SELECT id, name, category_id, price, quantity FROM products"
+    if ids is None:
+        return get_connection().execute(f"{select} ORDER BY id")
+    return iter(_rows_by_id(select, "id", ids))
+
+
+def category_records():
+    """Cursor over (id, name) of every category, for callers that must not see a cached list"""
+    return get_connection().execute("SELECT id, name FROM categories")
+
+
+def add_product(name, category, price, quantity, image=None):
+    """Insert a product and return its new row.
+
+    `image`, if given, is an image_pipeline.PreparedImage; it is stored
+    with its thumbnail, and identical images are stored once and shared.
+    Raises ImageTooLargeError if the image exceeds MAX_IMAGE_BYTES and
+    ValueError if the category does not exist.
+    """
+    conn = get_connection()
+    with conn:
+        category_id = _category_id(conn, category)
+        digest = _store_image(conn, image.data, image.thumb, image.original_size) if image else None
+        cur = conn.execute(
+            "INSERT INTO products (name, category_id, price, quantity, image_hash) VALUES (?, ?, ?, ?, ?)",
+            (name, category_id, price, quantity, digest),
+        )
+    return Product(cur.lastrowid, name, category, price, quantity)
+
+
+def insert_products(conn, rows):
+    """Insert many validated (name, category, price, quantity) rows in the caller's transaction"""
+    conn.executemany(
+        "INSERT INTO products (name, category_id, price, quantity) VALUES (?, (SELECT id FROM categories WHERE name=?), ?, ?)",
+        rows,
+    )
+
+
+def delete_products(ids):
+    """Delete several products in one transaction"""
+    with transaction() as conn:
+        conn.executemany("DELETE FROM products WHERE id=?", ((i,) for i in ids))
+
+
+def get_products(ids):
+    """Current rows for the given ids (missing ids are skipped)"""
+    return [Product._make(row) for row in _rows_by_id(PRODUCT_SELECT, "p.id", ids)]
+
+
+PRODUCT_EDIT_FIELDS = {"price": float, "quantity": int, "category": str}
+
+
+def update_products(ids, field, value):
+    """Set one field on several products in one transaction; returns the updated rows"""
+    value = _edit_value(PRODUCT_EDIT_FIELDS, field, value)
+    with transaction() as conn:
+        if field == "category":
+            field, value = "category_id", _category_id(conn, value)
+        conn.executemany(f"UPDATE products SET {field}=? WHERE id=?", ((value, i) for i in ids))
+    return get_products(ids)
+
+
+# Numeric filters in the search box, e.g. "price<100", "qty>=5", "price:10-20"
+_FILTER_RE = re.compile(
+    r"^(price|qty|quantity|السعر|الكمية)(?:(<=|>=|<|>|=)(\d+(?:\.\d+)?)|:(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?))$",
+    re.IGNORECASE,
+)
+_FILTER_COLUMNS = {"price": "p.price", "السعر": "p.price", "qty": "p.quantity", "quantity": "p.quantity", "الكمية": "p.quantity"}
+
+
+def parse_search(query):
+    """Split a search string into an FTS5 MATCH expression and SQL range predicates"""
+    terms, where, params = [], [], []
+    for token in query.split():
+        m = _FILTER_RE.match(token)
+        if m:
+            column = _FILTER_COLUMNS[m.group(1).lower()]
+            if m.group(2):
+                where.append(f"{column} {m.group(2)} ?")
+                params.append(float(m.group(3)))
+            else:
+                where.append(f"{column} BETWEEN ? AND ?")
+                params.extend((float(m.group(4)), float(m.group(5))))
+        else:
+            terms.extend(re.findall(r"\w+", fold_text(token)))
+    match = " ".join(f'"{term}"*' for term in terms)
+    return match, where, params
+
+
+def search_products(query, limit=SEARCH_LIMIT, filters=None, sort=None, descending=False):
+    """Prefix search on name and category through the FTS5 index, best matches first.
+
+    Price and quantity filters in the query become SQL range predicates, as
+    do the facet `filters`. A `sort` column from PRODUCT_SORTS replaces the
+    ranking.
+    """
+    match, where, params = parse_search(query)
+    facet_where, facet_params = compile_filters(PRODUCT_FACETS, filters)
+    where += facet_where
+    params += facet_params
+    if match:
+        sql = """
+        SELECT p.id, p.name, c.name, p.price, p.quantity
+        FROM products_fts
+        JOIN products p ON p.id = products_fts.rowid
+        JOIN categories c ON c.id = p.category_id
+        WHERE products_fts MATCH ?
+        """
+        params = [match] + params
+        order = "ORDER BY products_fts.rank"
+    else:
+        sql = f"{PRODUCT_SELECT} WHERE 1"
+        order = "ORDER BY p.id"
+    for predicate in where:
+        sql += f" AND {predicate}"
+    if sort is not None:
+        if sort not in PRODUCT_SORTS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        keys = [expr for expr, _ in PRODUCT_SORTS[sort]] + ["p.id"]
+        order = "ORDER BY " + ", ".join(f"{key} DESC" if descending else key for key in keys)
+    cur = get_connection().execute(f"{sql} {order} LIMIT ?", params + [limit])
+    return [Product._make(row) for row in cur.fetchall()]
+
+
+# --- Images ---
+def _store_image(conn, data, thumb=None, original_size=None):
+    if len(data) > MAX_IMAGE_BYTES:
+        raise ImageTooLargeError(len(data))
+    digest = image_hash(data)
+    conn.execute(
+        "INSERT OR IGNORE INTO images (hash, data, size, thumb, original_size) VALUES (?, ?, ?, ?, ?)",
+        (digest, data, len(data), thumb, original_size),
+    )
+    if thumb is not None:
+        conn.execute("UPDATE images SET thumb=? WHERE hash=? AND thumb IS NULL", (thumb, digest))
+    if original_size is not None:
+        conn.execute("UPDATE images SET original_size=? WHERE hash=? AND original_size IS NULL", (original_size, digest))
+    return digest
+
+
+def store_image(data, thumb=None, original_size=None):
+    """Store image bytes once under their content hash and return the hash.
+
+    `original_size` is the size of the upload the bytes were made from,
+    if they were downscaled or recompressed.
+    """
+    conn = get_connection()
+    with conn:
+        return _store_image(conn, data, thumb, original_size)
+
+
+def attach_images(conn, pairs):
+    """Store (product id, image_pipeline.PreparedImage) pairs and point the products at them, in the caller's transaction"""
+    conn.executemany(
+        "UPDATE products SET image_hash=? WHERE id=?",
+        [(_store_image(conn, image.data, image.thumb, image.original_size), product_id) for product_id, image in pairs],
+    )
+
+
+def replace_image(digest, data, thumb, original_size):
+    """Swap a stored image for a recompressed version; products follow it to the new hash"""
+    with transaction() as conn:
+        new_digest = _store_image(conn, data, thumb, original_size)
+        if new_digest != digest:
+            # Every product moves to the new hash, so the old image can go
+            conn.execute("UPDATE products SET image_hash=? WHERE image_hash=?", (new_digest, digest))
+            conn.execute("DELETE FROM images WHERE hash=?", (digest,))
+        else:
+            conn.execute("UPDATE images SET thumb=?, original_size=? WHERE hash=?", (thumb, original_size, digest))
+    return new_digest
+
+
+@contextmanager
+def open_image(digest):
+    """Read-only file-like view over a stored image, without copying it into bytes first"""
+    conn = get_connection()
+    row = conn.execute("SELECT rowid FROM images WHERE hash=?", (digest,)).fetchone()
+    if row is None:
+        raise KeyError(digest)
+    if not hasattr(conn, "blobopen"):
+        yield io.BytesIO(get_image_data(digest))
+        return
+    with conn.blobopen("images", "data", row[0], readonly=True) as blob:
+        yield blob
+
+
+def get_product_image_ref(product_id):
+    """Return (name, image hash or None) for a product, without reading image data"""
+    cur = get_connection().execute("SELECT name, image_hash FROM products WHERE id=?", (product_id,))
+    return cur.fetchone()
+
+
+def get_image_data(digest):
+    row = get_connection().execute("SELECT data FROM images WHERE hash=?", (digest,)).fetchone()
+    return row[0] if row else None
+
+
+def get_thumbnail(digest):
+    row = get_connection().execute("SELECT thumb FROM images WHERE hash=?", (digest,)).fetchone()
+    return row[0] if row else None
+
+
+def set_thumbnail(digest, thumb):
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE images SET thumb=? WHERE hash=?", (thumb, digest))
+
+
+def set_thumbnails(pairs):
+    """Store many (hash, thumb) pairs in one transaction"""
+    conn = get_connection()
+    with conn:
+        conn.executemany("UPDATE images SET thumb=? WHERE hash=?", ((thumb, digest) for digest, thumb in pairs))
+
+
+class ImageStats(NamedTuple):
+    images: int
+    stored_bytes: int
+    original_bytes: int  # as uploaded; equal to stored_bytes for images never recompressed
+    unprocessed: int     # stored before the ingestion pipeline, as uploaded
+
+
+def image_storage_stats():
+    """Totals of stored image bytes against the uploads they were made from"""
+    row = get_connection().execute("""
+    SELECT COUNT(*), TOTAL(size), TOTAL(COALESCE(original_size, size)), COUNT(*) - COUNT(original_size)
+    FROM images
+    """).fetchone()
+    return ImageStats(row[0], int(row[1]), int(row[2]), row[3])
+
+
+def unprocessed_images():
+    """Hashes of images stored as uploaded, before the ingestion pipeline"""
+    cur = get_connection().execute("SELECT hash FROM images WHERE original_size IS NULL")
+    return [row[0] for row in cur.fetchall()]
+
+
+def missing_thumbnails():
+    """Hashes of stored images that have no thumbnail yet"""
+    cur = get_connection().execute("SELECT hash FROM images WHERE thumb IS NULL")
+    return [row[0] for row in cur.fetchall()]
+
+
+# --- Categories ---
+def list_categories():
+    cur = get_connection().execute("SELECT id, name FROM categories")
+    return [Category._make(row) for row in cur.fetchall()]
+
+
+def category_names():
+    cur = get_connection().execute("SELECT name FROM categories")
+    return [row[0] for row in cur.fetchall()]
+
+
+def add_category(name):
+    """Insert a category; raises sqlite3.IntegrityError if the name exists"""
+    conn = get_connection()
+    with conn:
+        cur = conn.execute("INSERT INTO categories (name) VALUES (?)", (name,))
+    return Category(cur.lastrowid, name)
+
+
+def ensure_categories(conn, names):
+    """Create any of `names` that do not exist yet, in the caller's transaction"""
+    conn.executemany("INSERT OR IGNORE INTO categories (name) VALUES (?)", ((name,) for name in names))
+
+
+def _category_id(conn, name):
+    row = conn.execute("SELECT id FROM categories WHERE name=?", (name,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown category: {name}")
+    return row[0]
+
+
+# --- Inventory summary ---
+def inventory_summary():
+    """Per-category counts, stock and stock value, read from category_stats in O(categories)"""
+    cur = get_connection().execute("""
+    SELECT c.id, c.name, COALESCE(s.product_count, 0), COALESCE(s.total_quantity, 0),
+           COALESCE(s.stock_value, 0.0), COALESCE(s.low_stock, 0)
+    FROM categories c LEFT JOIN category_stats s ON s.category_id = c.id
+    ORDER BY c.name
+    """)
+    return [CategoryStats._make(row) for row in cur.fetchall()]
+
+
+def check_inventory_summary():
+    """Compare category_stats with a full scan of products; returns [(category_id, stored, actual)]"""
+    conn = get_connection()
+    stored = {row[0]: row[1:] for row in conn.execute(
+        "SELECT category_id, product_count, total_quantity, stock_value, low_stock FROM category_stats")}
+    actual = {row[0]: row[1:] for row in conn.execute(_INVENTORY_SCAN_SQL)}
+    mismatches = []
+    for category_id in sorted(stored.keys() | actual.keys()):
+        have = stored.get(category_id, (0, 0, 0.0, 0))
+        want = actual.get(category_id, (0, 0, 0.0, 0))
+        # Stock value is a running float sum; allow rounding drift below a cent
+        if (have[0], have[1], have[3]) != (want[0], want[1], want[3]) or abs(have[2] - want[2]) >= 0.005:
+            mismatches.append((category_id, have, want))
+    return mismatches
+
+
+def rebuild_inventory_summary():
+    """Recompute category_stats from products in one transaction; returns the number of categories"""
+    with transaction() as conn:
+        conn.execute("DELETE FROM category_stats")
+        return conn.execute(_INVENTORY_FILL_SQL).rowcount
+
+
+def delete_categories(ids):
+    """Delete several categories in one transaction.
+
+    Raises sqlite3.IntegrityError if a category still has products.
+    """
+    with transaction() as conn:
+        conn.executemany("DELETE FROM categories WHERE id=?", ((i,) for i in ids))
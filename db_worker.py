@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background worker for database and image jobs.
+
+Button callbacks hand their SQL and image decoding to a worker thread, so a
+slow disk or a lock held by another instance never freezes the window.
+Results come back to the Tk thread through root.after polling, and the
+buttons that started a job stay disabled, with a busy cursor, until it ends.
+"""
+
+import queue
+import threading
+import tkinter as tk
+import traceback
+
+
+class DBWorker:
+    """Run jobs on background threads and deliver their results on the Tk thread.
+
+    With the default single thread, jobs run one at a time in the order they
+    were submitted, so a write is always visible to the reads queued after it.
+    Each worker thread uses its own pooled database connection.
+    """
+
+    # How often the Tk thread checks for finished jobs (about one frame)
+    POLL_MS = 16
+
+    def __init__(self, root, workers=1):
+        self.root = root
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = 0
+        self._polling = False
+        self._busy = {}  # widget -> number of running jobs that disabled it
+        self._threads = [
+            threading.Thread(target=self._run, name=f"db-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job, on_done=None, on_error=None, busy=()):
+        """Run `job()` on a worker; then call `on_done(result)` or `on_error(exception)` on the Tk thread.
+
+        Widgets in `busy` are disabled until the job has finished. Errors
+        without an `on_error` handler are printed.
+        """
+        busy = tuple(busy)
+        for widget in busy:
+            self._set_busy(widget, 1)
+        self._pending += 1
+        self._jobs.put((job, on_done, on_error, busy))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    @property
+    def idle(self):
+        return self._pending == 0
+
+    def stop(self, timeout=5.0):
+        """Let queued jobs finish, then end the worker threads"""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            job, on_done, on_error, busy = item
+            try:
+                result, error = job(), None
+            except Exception as e:
+                result, error = None, e
+            self._results.put((result, error, on_done, on_error, busy))
+
+    def _poll(self):
+        try:
+            while True:
+                try:
+                    result, error, on_done, on_error, busy = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                self._pending -= 1
+                for widget in busy:
+                    self._set_busy(widget, -1)
+                try:
+                    if error is None:
+                        if on_done is not None:
+                            on_done(result)
+                    elif on_error is not None:
+                        on_error(error)
+                    else:
+                        print("Background job failed:")
+                        traceback.print_exception(error)
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            # Always reschedule, or no later result would ever be delivered
+            if self._pending:
+                self.root.after(self.POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def _set_busy(self, widget, delta):
+        count = self._busy.get(widget, 0) + delta
+        if count > 0:
+            self._busy[widget] = count
+        else:
+            self._busy.pop(widget, None)
+        try:
+            widget.configure(state="disabled" if count > 0 else "normal")
+        except tk.TclError:
+            # Destroyed while its job ran, e.g. a dialog closed before the job ended
+            pass
+        self.root.configure(cursor="watch" if self._busy else "")
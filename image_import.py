@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch import of product images from a directory.
+
+Files are matched to products by their name, or by a product id taken
+from the file name with a pattern (e.g. SKU-style "1042.jpg" or
+"P1042_front.png"). Matched photos are decoded, validated, oriented,
+downscaled and recompressed by image_pipeline in a process pool, and
+written in batched transactions. Usage:
+
+    python image_import.py photos/                       # "Blue Pen.jpg" -> product named "blue pen"
+    python image_import.py photos/ --match id --pattern "P(\\d+)"
+    python image_import.py photos/ --dry-run --report mismatches.csv
+
+Files that match no product, or more than one, and files that cannot be
+decoded are listed in the report instead of stopping the import.
+"""
+
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import image_pipeline
+
+DEFAULT_BATCH_SIZE = 100
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"}
+# Group 1 of the pattern, applied to the file name without extension, is the match key
+DEFAULT_PATTERNS = {"name": r"(.+)", "id": r"(\d+)"}
+
+
+class ImageImportReport:
+    """Counts, timing and mismatches of one image import run"""
+
+    def __init__(self, directory, dry_run=False):
+        self.directory = directory
+        self.dry_run = dry_run
+        self.scanned = 0
+        self.matched = 0
+        self.attached = 0
+        self.original_bytes = 0
+        self.stored_bytes = 0
+        self.mismatches = []  # (file name, reason)
+        self.seconds = 0.0
+
+    @property
+    def images_per_second(self):
+        return self.attached / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        action = "Would attach" if self.dry_run else "Attached"
+        count = self.matched if self.dry_run else self.attached
+        lines = [
+            f"{action} {count} of {self.scanned} images from {self.directory}",
+            f"Time: {self.seconds:.2f}s" + (f" ({self.images_per_second:,.1f} images/s)" if self.attached else ""),
+            f"Mismatched or rejected files: {len(self.mismatches)}",
+        ]
+        if self.attached:
+            lines.append(f"Stored {self.stored_bytes / 1048576:.1f} MB of {self.original_bytes / 1048576:.1f} MB read")
+        for name, reason in self.mismatches[:10]:
+            lines.append(f"  {name}: {reason}")
+        if len(self.mismatches) > 10:
+            lines.append(f"  ... and {len(self.mismatches) - 10} more")
+        return "\n".join(lines)
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "reason"])
+            writer.writerows(self.mismatches)
+
+
+def _name_key(text):
+    """Compare names regardless of case, Arabic variants and _/- separators"""
+    return " ".join(re.split(r"[\s_\-]+", database.fold_text(text).lower())).strip()
+
+
+def scan_directory(directory):
+    """Image files directly inside `directory`, sorted by name"""
+    return sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.is_file() and not entry.name.startswith(".")
+        and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+def match_files(files, report, match="name", pattern=None):
+    """Return [(file name, product id)] for the files that match exactly one product; the rest go in the report"""
+    regex = re.compile(pattern or DEFAULT_PATTERNS[match])
+    keys = {}
+    for name in files:
+        m = regex.search(os.path.splitext(name)[0])
+        if not m:
+            report.mismatches.append((name, f"file name does not match {regex.pattern}"))
+            continue
+        if match == "id" and not m.group(1).isdigit():
+            report.mismatches.append((name, f"not a product id: {m.group(1)}"))
+            continue
+        keys[name] = int(m.group(1)) if match == "id" else _name_key(m.group(1))
+
+    if match == "id":
+        found = {p.id: [p.id] for p in database.get_products(set(keys.values()))}
+    else:
+        # One pass over the product names, keeping only those some file asks for
+        wanted, found = set(keys.values()), {}
+        for product_id, product_name in database.get_connection().execute("SELECT id, name FROM products"):
+            key = _name_key(product_name)
+            if key in wanted:
+                found.setdefault(key, []).append(product_id)
+
+    matches, claimed = [], {}
+    for name, key in keys.items():
+        ids = found.get(key, [])
+        if not ids:
+            report.mismatches.append((name, "no matching product"))
+        elif len(ids) > 1:
+            report.mismatches.append((name, f"{len(ids)} products match"))
+        elif ids[0] in claimed:
+            report.mismatches.append((name, f"product {ids[0]} already matched by {claimed[ids[0]]}"))
+        else:
+            claimed[ids[0]] = name
+            matches.append((name, ids[0]))
+    return matches
+
+
+def _prepare(path):
+    """Runs in a pool process: the prepared image, or the error as text"""
+    from PIL import UnidentifiedImageError
+
+    try:
+        return image_pipeline.prepare_image(path)
+    except UnidentifiedImageError:
+        return "not a supported image file"
+    except Exception as e:
+        return f"cannot read image: {e}"
+
+
+def import_directory(directory, match="name", pattern=None, workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                     dry_run=False, progress=None):
+    """Attach the images in `directory` to the products they match.
+
+    With `dry_run`, files are only matched; nothing is decoded or written.
+    `progress(report)` is called after every batch. Returns an ImageImportReport.
+    """
+    report = ImageImportReport(directory, dry_run)
+    started = time.perf_counter()
+    files = scan_directory(directory)
+    report.scanned = len(files)
+    matches = match_files(files, report, match, pattern)
+    report.matched = len(matches)
+    if dry_run or not matches:
+        report.seconds = time.perf_counter() - started
+        return report
+
+    paths = [os.path.join(directory, name) for name, _ in matches]
+    batch = []
+
+    def flush():
+        with database.transaction() as conn:
+            database.attach_images(conn, batch)
+        report.attached += len(batch)
+        batch.clear()
+        report.seconds = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Results arrive in order while later files are still being decoded
+        for (name, product_id), image in zip(matches, pool.map(_prepare, paths, chunksize=4)):
+            if isinstance(image, str):
+                report.mismatches.append((name, image))
+                continue
+            report.original_bytes += image.original_size
+            report.stored_bytes += len(image.data)
+            batch.append((product_id, image))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Attach product images from a directory, matched by file name")
+    parser.add_argument("directory")
+    parser.add_argument("--match", choices=sorted(DEFAULT_PATTERNS), default="name",
+                        help="match files to products by name or by product id")
+    parser.add_argument("--pattern", help="regular expression whose first group is the name or id in the file name")
+    parser.add_argument("--workers", type=int, default=None, help="decoding processes (default: one per CPU)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="images written per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only match files and report; write nothing")
+    parser.add_argument("--report", help="write every mismatched or rejected file to this CSV file")
+    args = parser.parse_args()
+
+    database.init_db()
+    try:
+        report = import_directory(
+            args.directory, args.match, args.pattern, args.workers, args.batch_size, args.dry_run,
+            progress=lambda r: print(f"  {r.attached}/{r.matched} images attached ({r.images_per_second:,.1f}/s)..."),
+        )
+    finally:
+        database.close_all()
+    print(report.summary())
+    if args.report:
+        report.write_csv(args.report)
+        print(f"✓ Mismatch report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
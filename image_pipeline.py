@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Image ingestion: orientation, downscaling and recompression before storage.
+
+Product photos are only ever shown as a 300x300 thumbnail or a modest
+full-size view, so a 12 MB phone photo is turned upright, capped at
+MAX_DIMENSION pixels and re-encoded at QUALITY before it reaches the
+database. The originals are copied to ORIGINALS_DIR only if KEEP_ORIGINALS
+is set. Images stored before this pipeline existed can be reprocessed, and
+the savings reported, by running this script directly:
+
+    python image_pipeline.py               # bytes stored vs uploaded
+    python image_pipeline.py --recompress  # reprocess images stored as uploaded
+"""
+
+import argparse
+import io
+import os
+import shutil
+import time
+from typing import NamedTuple
+
+import database
+import thumbnails
+
+# Longest side of a stored image, in pixels
+MAX_DIMENSION = 1600
+# Encoding of stored images: "JPEG" or "WEBP"; images with transparency
+# stay PNG when the format cannot hold an alpha channel
+OUTPUT_FORMAT = "JPEG"
+QUALITY = 82
+# Copy each upload, untouched, to ORIGINALS_DIR (named by the stored image's hash)
+KEEP_ORIGINALS = False
+ORIGINALS_DIR = os.path.join(database.IMAGES_DIR, "originals")
+# Images handed to the process pool per database round trip by --recompress
+RECOMPRESS_BATCH = 16
+ORIENTATION_TAG = 0x0112
+
+
+class PreparedImage(NamedTuple):
+    data: bytes
+    thumb: bytes
+    hash: str
+    original_size: int
+
+
+def prepare_image(source, max_dimension=MAX_DIMENSION, output_format=OUTPUT_FORMAT, quality=QUALITY):
+    """Decode an upload (bytes or path), orient, downscale and re-encode it, and make its thumbnail.
+
+    Animated images, and uploads already upright, small enough and smaller
+    than their re-encoding, are kept as they are. Raises
+    database.ImageTooLargeError for uploads over MAX_IMAGE_BYTES.
+    """
+    from PIL import Image, ImageOps
+
+    # The size cap applies to the upload, before anything is read or decoded
+    size = len(source) if isinstance(source, bytes) else os.path.getsize(source)
+    if size > database.MAX_IMAGE_BYTES:
+        raise database.ImageTooLargeError(size)
+    if isinstance(source, bytes):
+        original = source
+    else:
+        with open(source, "rb") as f:
+            original = f.read()
+    img = Image.open(io.BytesIO(original))
+    if getattr(img, "is_animated", False):
+        return _prepared(original, thumbnails.make_thumbnail(img), len(original))
+
+    rotated = img.getexif().get(ORIENTATION_TAG, 1) != 1
+    resized = max(img.size) > max_dimension
+    if resized:
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, which is much faster
+        scale = max_dimension / max(img.size)
+        img.draft(img.mode, (int(img.width * scale) + 1, int(img.height * scale) + 1))
+    upright = ImageOps.exif_transpose(img)
+    if resized:
+        upright.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    thumb = thumbnails.make_thumbnail(upright)
+
+    has_alpha = upright.mode in ("RGBA", "LA", "PA") or "transparency" in upright.info
+    out = io.BytesIO()
+    if has_alpha and output_format == "JPEG":
+        upright.save(out, format="PNG", optimize=True)
+    elif has_alpha:
+        upright.convert("RGBA").save(out, format=output_format, quality=quality)
+    else:
+        upright.convert("RGB").save(out, format=output_format, quality=quality, optimize=True)
+    data = out.getvalue()
+    if not (rotated or resized) and len(data) >= len(original):
+        data = original
+    return _prepared(data, thumb, len(original))
+
+
+def _prepared(data, thumb, original_size):
+    return PreparedImage(data, thumb, database.image_hash(data), original_size)
+
+
+def ingest(path):
+    """Prepare an upload for add_product, keeping a copy of the original if configured"""
+    image = prepare_image(path)
+    if KEEP_ORIGINALS:
+        os.makedirs(ORIGINALS_DIR, exist_ok=True)
+        shutil.copyfile(path, os.path.join(ORIGINALS_DIR, image.hash + os.path.splitext(path)[1].lower()))
+    print(f"Image {os.path.basename(path)}: {image.original_size / 1024:.0f} KB -> {len(image.data) / 1024:.0f} KB")
+    return image
+
+
+def _prepare_or_none(data):
+    try:
+        return prepare_image(data)
+    except Exception as e:
+        print(f"Cannot recompress image: {e}")
+        return None
+
+
+def recompress_stored(workers=None, batch=RECOMPRESS_BATCH):
+    """Reprocess images stored as uploaded, in a process pool; returns how many were replaced"""
+    # Imported here, as in thumbnails.backfill_thumbnails
+    from concurrent.futures import ProcessPoolExecutor
+
+    hashes = database.unprocessed_images()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(hashes), batch):
+            chunk = hashes[start:start + batch]
+            originals = [database.get_image_data(digest) for digest in chunk]
+            for digest, image in zip(chunk, pool.map(_prepare_or_none, originals)):
+                if image is not None:
+                    database.replace_image(digest, image.data, image.thumb, image.original_size)
+                    done += 1
+            print(f"Recompressed: {min(start + batch, len(hashes))}/{len(hashes)}")
+    return done
+
+
+def print_stats():
+    stats = database.image_storage_stats()
+    saved = stats.original_bytes - stats.stored_bytes
+    print(f"Images: {stats.images} ({stats.unprocessed} stored as uploaded)")
+    print(f"Stored: {stats.stored_bytes / 1048576:.1f} MB of {stats.original_bytes / 1048576:.1f} MB uploaded, "
+          f"{saved / 1048576:.1f} MB saved ({saved / max(stats.original_bytes, 1):.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report image storage savings, or recompress images stored as uploaded")
+    parser.add_argument("--recompress", action="store_true", help="orient, downscale and re-encode images stored as uploaded")
+    parser.add_argument("--workers", type=int, default=None, help="processes used by --recompress")
+    args = parser.parse_args()
+
+    database.init_db()
+    try:
+        if args.recompress:
+            started = time.perf_counter()
+            done = recompress_stored(args.workers)
+            # Give the freed pages back to the file system
+            database.get_connection().execute("VACUUM")
+            print(f"✓ {done} image(s) recompressed in {time.perf_counter() - started:.1f}s")
+        print_stats()
+    finally:
+        database.close_all()
+
+
+if __name__ == "__main__":
+    main()
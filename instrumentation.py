@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Timing instrumentation for database and image operations.
+
+Wrapped operations record call counts, errors, rows returned and a latency
+histogram. SQLite's trace callback and progress handler attribute every
+SQL statement and an estimate of VM work to the innermost running
+operation, so a slow operation can be told apart from a busy one. The app
+shows the numbers in a hidden diagnostics window (Ctrl+Shift+D) and dumps
+them to JSON on exit.
+"""
+
+import functools
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import database
+
+DUMP_FILE = "performance_stats.json"
+# Upper bounds (ms) of the latency histogram buckets; slower calls go in the last one
+HISTOGRAM_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# SQLite calls the progress handler once per this many VM instructions
+PROGRESS_STEPS = 10000
+# Distinct SQL texts counted before new ones are lumped together
+MAX_STATEMENTS = 200
+# The trace callback sees SQL with parameters filled in; literals are folded back to ?
+_LITERAL_RE = re.compile(r"[xX]?'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# Folded texts kept for SQL seen before (polls and lookups repeat the exact text)
+MAX_NORMALIZED = 1000
+
+_lock = threading.Lock()
+_local = threading.local()
+_stats = {}        # operation -> OperationStats
+_statements = {}   # SQL text -> times executed
+_started = time.time()
+_startup_origin = time.perf_counter()
+_startup = []      # (phase, ms since startup began)
+_counters = {}     # name -> callable returning a dict of counters
+_normalized = {}   # SQL as traced -> SQL with literals folded to ?
+enabled = False
+
+
+class OperationStats:
+    __slots__ = ("count", "errors", "rows", "total_ms", "max_ms", "histogram", "statements", "vm_steps")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_MS) + 1)
+        self.statements = 0
+        self.vm_steps = 0
+
+    def percentile(self, fraction):
+        """Upper bound of the histogram bucket holding the given fraction of calls"""
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_MS, self.histogram):
+            seen += count
+            if seen >= wanted:
+                return bound
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "statements": self.statements,
+            "vm_steps": self.vm_steps,
+            "histogram": dict(zip([f"<{b}ms" for b in HISTOGRAM_MS] + [f">={HISTOGRAM_MS[-1]}ms"], self.histogram)),
+        }
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _record(name, elapsed_ms, rows, failed, statements, vm_steps):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = OperationStats()
+        stats.count += 1
+        stats.errors += failed
+        stats.rows += rows
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        bucket = next((i for i, bound in enumerate(HISTOGRAM_MS) if elapsed_ms < bound), len(HISTOGRAM_MS))
+        stats.histogram[bucket] += 1
+        stats.statements += statements
+        stats.vm_steps += vm_steps
+
+
+@contextmanager
+def measure(name):
+    """Time a block as operation `name`; set `.rows` on the yielded frame to record rows"""
+    frame = _Frame()
+    stack = _stack()
+    stack.append(frame)
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield frame
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stack.pop()
+        if enabled:
+            _record(name, elapsed_ms, frame.rows, failed, frame.statements, frame.vm_steps)
+
+
+class _Frame:
+    __slots__ = ("rows", "statements", "vm_steps")
+
+    def __init__(self):
+        self.rows = 0
+        self.statements = 0
+        self.vm_steps = 0
+
+
+def timed(name, fn=None, trace=True):
+    """Wrap fn (or decorate) so every call is measured as `name`; list results count as rows.
+
+    With trace=False, SQL statements run by fn are not traced or counted
+    (see untraced()).
+    """
+    if fn is None:
+        return functools.partial(timed, name, trace=trace)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return fn(*args, **kwargs)
+        with measure(name) as frame, (nullcontext() if trace else untraced()):
+            result = fn(*args, **kwargs)
+            if isinstance(result, list):
+                frame.rows = len(result)
+            return result
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+
+def instrument(module, names, prefix=None, trace=True):
+    """Replace module.<name> by a timed wrapper for each name, e.g. database.list_products"""
+    prefix = prefix or module.__name__
+    for name in names:
+        fn = getattr(module, name)
+        if not hasattr(fn, "__wrapped__"):
+            setattr(module, name, timed(f"{prefix}.{name}", fn, trace))
+
+
+@contextmanager
+def untraced():
+    """Stop tracing SQL on this thread's connection for a block.
+
+    SQLite expands and hands over every statement, one per executemany
+    row, which more than doubles the time of a bulk import.
+    """
+    conn = database.get_connection()
+    conn.set_trace_callback(None)
+    try:
+        yield
+    finally:
+        if enabled:
+            conn.set_trace_callback(_on_statement)
+
+
+# --- SQLite hooks ---
+def _on_statement(sql):
+    if sql.startswith("--"):
+        # Statements run by triggers and virtual tables (e.g. FTS5 internals)
+        return
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].statements += 1
+    normalized = _normalized.get(sql)
+    if normalized is None:
+        normalized = " ".join(_LITERAL_RE.sub("?", sql).split())
+        if len(_normalized) >= MAX_NORMALIZED:
+            _normalized.clear()
+        _normalized[sql] = normalized
+    sql = normalized
+    with _lock:
+        if sql in _statements or len(_statements) < MAX_STATEMENTS:
+            _statements[sql] = _statements.get(sql, 0) + 1
+        else:
+            _statements["(other)"] = _statements.get("(other)", 0) + 1
+
+
+def _on_progress():
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].vm_steps += PROGRESS_STEPS
+    return 0  # never abort the statement
+
+
+def _hook_connection(conn):
+    conn.set_trace_callback(_on_statement)
+    conn.set_progress_handler(_on_progress, PROGRESS_STEPS)
+
+
+def enable():
+    """Start recording and hook every current and future database connection"""
+    global enabled
+    if enabled:
+        return
+    enabled = True
+    database.add_connection_hook(_hook_connection)
+
+
+def add_counters(name, source):
+    """Report source() (a dict, e.g. a cache's hit and miss counts) under `name` in snapshots"""
+    _counters[name] = source
+
+
+# --- Startup timing ---
+def startup_began(at):
+    """Measure startup phases from `at` (a time.perf_counter() value) instead of this module's import"""
+    global _startup_origin
+    _startup_origin = at
+
+
+def mark_startup(phase):
+    _startup.append((phase, round((time.perf_counter() - _startup_origin) * 1000, 1)))
+
+
+def startup_summary():
+    return "Startup: " + ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in _startup)
+
+
+# --- Reporting ---
+def snapshot():
+    with _lock:
+        operations = {name: stats.as_dict() for name, stats in _stats.items()}
+        statements = sorted(_statements.items(), key=lambda item: -item[1])
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_started)),
+        "seconds": round(time.time() - _started, 1),
+        "startup_ms": dict(_startup),
+        "operations": dict(sorted(operations.items(), key=lambda item: -item[1]["total_ms"])),
+        "top_statements": [{"sql": sql, "count": count} for sql, count in statements[:50]],
+        "counters": {name: source() for name, source in _counters.items()},
+    }
+
+
+def reset():
+    global _started
+    with _lock:
+        _stats.clear()
+        _statements.clear()
+        _started = time.time()
+
+
+def dump(path=DUMP_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2, ensure_ascii=False)
+    return path
+
+
+class DiagnosticsWindow:
+    """Toplevel table of the recorded operations, refreshed every second while open"""
+
+    REFRESH_MS = 1000
+    COLUMNS = ("Operation", "Count", "Errors", "Rows", "Mean ms", "p95 ms", "Max ms", "SQL", "VM steps")
+
+    def __init__(self, root):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        self.window.geometry("900x400")
+        self.tree = ttk.Treeview(self.window, columns=self.COLUMNS, show="headings")
+        for col in self.COLUMNS:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=260 if col == "Operation" else 80, anchor="w" if col == "Operation" else "e")
+        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+        buttons = tk.Frame(self.window)
+        buttons.pack(fill="x", padx=5, pady=(0, 5))
+        tk.Button(buttons, text="Reset", command=self.reset).pack(side="left")
+        tk.Button(buttons, text="Save JSON", command=self.save).pack(side="left", padx=5)
+        self.status = tk.Label(buttons, anchor="e", text=startup_summary())
+        self.status.pack(side="right")
+        self.counters = tk.Label(buttons, anchor="w")
+        self.counters.pack(side="left", padx=10)
+        self._tick()
+
+    def _tick(self):
+        if self.window.winfo_exists():
+            self.refresh()
+            self.window.after(self.REFRESH_MS, self._tick)
+
+    def refresh(self):
+        data = snapshot()
+        self.tree.delete(*self.tree.get_children())
+        for name, stats in data["operations"].items():
+            self.tree.insert("", "end", values=(
+                name, stats["count"], stats["errors"], stats["rows"], f"{stats['mean_ms']:.2f}",
+                stats["p95_ms"], f"{stats['max_ms']:.1f}", stats["statements"], stats["vm_steps"],
+            ))
+        self.counters.config(text="    ".join(
+            f"{name}: " + ", ".join(f"{key} {value}" for key, value in counters.items())
+            for name, counters in data["counters"].items()))
+
+    def reset(self):
+        reset()
+        self.refresh()
+
+    def save(self):
+        self.status.config(text=f"Saved to {dump()}")
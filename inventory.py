@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inventory summary report, consistency check and rebuild.
+
+The per-category summary (product count, stock, stock value, low-stock
+items) is kept up to date by triggers on the products table. This script
+prints it, checks it against a full scan of products, or rebuilds it:
+
+    python inventory.py            # print the summary
+    python inventory.py --check    # exit code 1 if the summary is out of date
+    python inventory.py --rebuild  # recompute it from products
+"""
+
+import argparse
+import sys
+
+import database
+
+
+def print_summary():
+    rows = database.inventory_summary()
+    print(f"{'Category':<30} {'Products':>10} {'Quantity':>12} {'Stock value':>16} {'Low stock':>10}")
+    for row in rows:
+        print(f"{row.category:<30} {row.product_count:>10} {row.total_quantity:>12} {row.stock_value:>16,.2f} {row.low_stock:>10}")
+    print(f"{'Total':<30} {sum(r.product_count for r in rows):>10} {sum(r.total_quantity for r in rows):>12} "
+          f"{sum(r.stock_value for r in rows):>16,.2f} {sum(r.low_stock for r in rows):>10}")
+
+
+def check():
+    mismatches = database.check_inventory_summary()
+    for category_id, stored, actual in mismatches:
+        print(f"Category {category_id}: summary {stored} != products {actual}")
+    if mismatches:
+        print(f"✗ {len(mismatches)} category summaries are out of date; run with --rebuild")
+        return 1
+    print("✓ Inventory summary matches the products table")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory summary report, check and rebuild")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--check", action="store_true", help="compare the summary with a full scan of products")
+    group.add_argument("--rebuild", action="store_true", help="recompute the summary from products")
+    args = parser.parse_args()
+
+    database.init_db()
+    try:
+        if args.check:
+            return check()
+        if args.rebuild:
+            print(f"✓ Rebuilt the summary of {database.rebuild_inventory_summary()} categories")
+            return 0
+        print_summary()
+        return 0
+    finally:
+        database.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
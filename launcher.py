@@ -7,6 +7,7 @@ This script launches the main application with proper error handling
 
 import sys
 import os
+import importlib.util
 import subprocess
 import tkinter as tk
 from tkinter import messagebox
@@ -20,9 +21,8 @@ def check_dependencies():
     except ImportError:
         missing_deps.append("tkinter")
     
-    try:
-        import PIL
-    except ImportError:
+    # Only look Pillow up: importing it here would slow down every start
+    if importlib.util.find_spec("PIL") is None:
         missing_deps.append("Pillow (PIL)")
     
     try:
@@ -70,16 +70,12 @@ def main():
     
     # Launch the main application
     try:
-        # Import and run the main application
-        from app import init_db
-        
-        # Initialize database
-        init_db()
-        
-        # Import the main application window
+        # Import the main application once and run it; the database is
+        # opened by the app itself after its window is on screen
         import app
         
         print("Application started successfully!")
+        app.main()
         
     except Exception as e:
         # Show error dialog
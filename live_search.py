@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Debounced search-as-you-type.
+
+Keystrokes restart a short debounce timer; when it fires, the query runs on
+a background thread with its own database connection. A newer query
+interrupts the one in flight, and only the latest query's results are
+handed back to the Tk thread, which picks them up with root.after polling.
+"""
+
+import queue
+import sqlite3
+import threading
+
+import database
+
+
+class LiveSearch:
+    """Run `search(query)` off the Tk thread and deliver results to `on_results`"""
+
+    DEBOUNCE_MS = 250
+    # How often the Tk thread checks for finished searches (about one frame)
+    POLL_MS = 16
+
+    def __init__(self, root, search, on_results, debounce_ms=DEBOUNCE_MS):
+        self.root = root
+        self.search = search
+        self.on_results = on_results
+        self.debounce_ms = debounce_ms
+        self._timer = None
+        self._polling = False
+        self._generation = 0
+        self._awaiting = None    # generation whose results the GUI still wants
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._request = None     # (generation, query) waiting for the worker
+        self._conn = None        # worker connection, for interrupting stale queries
+        self._results = queue.Queue()
+        threading.Thread(target=self._worker, name="live-search", daemon=True).start()
+
+    def schedule(self, query):
+        """Restart the debounce timer for `query`"""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+        self._timer = self.root.after(self.debounce_ms, self.submit, query)
+
+    def submit(self, query):
+        """Start `query` now, superseding any search still running"""
+        self._timer = None
+        with self._lock:
+            self._generation += 1
+            self._request = (self._generation, query)
+            if self._conn is not None:
+                self._conn.interrupt()
+            self._wakeup.notify()
+        self._awaiting = self._generation
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def cancel(self):
+        """Drop the pending and running searches without delivering results"""
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        with self._lock:
+            self._generation += 1
+            self._request = None
+            if self._conn is not None:
+                self._conn.interrupt()
+        self._awaiting = None
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                while self._request is None:
+                    self._wakeup.wait()
+                generation, query = self._request
+                self._request = None
+                self._conn = database.get_connection()
+            try:
+                results = self.search(query)
+            except Exception as e:
+                # Interrupted by a newer keystroke; anything else is reported
+                if not (isinstance(e, sqlite3.OperationalError) and "interrupted" in str(e)):
+                    print(f"Search error: {e}")
+                results = None
+            self._results.put((generation, results))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, results = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._awaiting:
+                self._awaiting = None
+                if results is not None:
+                    self.on_results(results)
+        if self._awaiting is None:
+            self._polling = False
+        else:
+            self.root.after(self.POLL_MS, self._poll)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact in-memory copy of the product catalog.
+
+Products are held column by column: ids, prices (as the exact floats
+SQLite stores), quantities and category ids in typed arrays, names as UTF-8 bytes (half
+the size of an Arabic str, and ordered like SQLite's BINARY collation),
+and category names once per category. That is a fraction of the memory of a
+list of row tuples, where every row carries its own float, ints and
+category string. The cache answers counts, sorted and filtered pages and
+an infix search without querying SQLite, and catches up with other
+writers by replaying the change log. Run this script for its footprint:
+
+    python product_cache.py
+"""
+
+import bisect
+import sys
+import threading
+import time
+from array import array
+
+import database
+
+
+class ProductRow:
+    """Read-only view of one cached product; valid until the cache next changes"""
+
+    __slots__ = ("_cache", "_pos")
+
+    def __init__(self, cache, pos):
+        self._cache = cache
+        self._pos = pos
+
+    @property
+    def id(self):
+        return self._cache.ids[self._pos]
+
+    @property
+    def name(self):
+        return self._cache.names[self._pos].decode("utf-8")
+
+    @property
+    def category(self):
+        return self._cache.categories.get(self._cache.category_ids[self._pos], "")
+
+    @property
+    def price(self):
+        return self._cache.prices[self._pos]
+
+    @property
+    def quantity(self):
+        return self._cache.quantities[self._pos]
+
+    def as_product(self):
+        return database.Product(self.id, self.name, self.category, self.price, self.quantity)
+
+
+class ProductCache:
+    """Column-oriented product rows, ordered by id.
+
+    Call sync() before reading to apply the changes made since the last
+    load or sync; reads never touch the database. All methods are safe to
+    call from several threads.
+    """
+
+    # Reload instead of patching when a sync touches more than this share of rows
+    RELOAD_FRACTION = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.seq = 0
+        self._swap(_Columns(), {})
+
+    def _swap(self, columns, categories):
+        self.ids = columns.ids
+        self.prices = columns.prices
+        self.quantities = columns.quantities
+        self.category_ids = columns.category_ids
+        self.names = columns.names
+        self.categories = categories  # category id -> name
+        self._orders = {}             # sort column -> row positions in that order
+        self._search_text = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- Loading and change replay ---
+    # Everything is read from the database before the cache is touched, so
+    # a failed or interrupted read leaves the previous rows and position intact.
+    def load(self):
+        """Read every product; returns the number of rows"""
+        with self._lock:
+            return self._load()
+
+    def sync(self):
+        """Apply product and category changes recorded since the last load or sync"""
+        if not self.loaded:
+            return
+        with self._lock:
+            result = database.changed_rows(self.seq)
+            if result is None:
+                # The change log was pruned past our position
+                self._load()
+                return
+            changed, seq = result
+            ids = changed.get("products", ())
+            if len(ids) > self.RELOAD_FRACTION * max(len(self.ids), 1000):
+                self._load()
+                return
+            categories = self._read_categories() if "categories" in changed else self.categories
+            current = {row[0]: row for row in database.product_records(ids)} if ids else {}
+            # Nothing below reads the database, so the patch cannot be cut short
+            self.categories = categories
+            for product_id in sorted(ids):
+                pos = bisect.bisect_left(self.ids, product_id)
+                exists = pos < len(self.ids) and self.ids[pos] == product_id
+                row = current.get(product_id)
+                if row is None:
+                    if exists:
+                        self._delete(pos)
+                elif exists:
+                    self._set(pos, row)
+                else:
+                    self._insert(pos, row)
+            if ids or "categories" in changed:
+                # The category sort and the search text both hold category names
+                self._orders.clear()
+                self._search_text = None
+            self.seq = seq
+
+    def _load(self):
+        # Taken before the rows are read: anything written meanwhile is replayed by sync()
+        seq = database.change_seq()
+        categories = self._read_categories()
+        columns = _Columns()
+        for row in database.product_records():
+            columns.append(row)
+        self._swap(columns, categories)
+        self.seq = seq
+        self.loaded = True
+        return len(self.ids)
+
+    @staticmethod
+    def _read_categories():
+        # Straight from the database: the app serves list_categories from a read
+        # cache that may not have seen another process's new category yet
+        return {category_id: sys.intern(name) for category_id, name in database.category_records()}
+
+    def _insert(self, pos, row):
+        product_id, name, category_id, price, quantity = row
+        self.ids.insert(pos, product_id)
+        self.names.insert(pos, name.encode("utf-8"))
+        self.category_ids.insert(pos, category_id)
+        self.prices.insert(pos, price)
+        self.quantities.insert(pos, quantity)
+
+    def _set(self, pos, row):
+        _, name, self.category_ids[pos], self.prices[pos], self.quantities[pos] = row
+        self.names[pos] = name.encode("utf-8")
+
+    def _delete(self, pos):
+        for column in (self.ids, self.names, self.category_ids, self.prices, self.quantities):
+            del column[pos]
+
+    # --- Reads ---
+    def get(self, product_id):
+        """The row view for a product id, or None"""
+        with self._lock:
+            pos = bisect.bisect_left(self.ids, product_id)
+            if pos < len(self.ids) and self.ids[pos] == product_id:
+                return ProductRow(self, pos)
+            return None
+
+    def count(self, filters=None):
+        """How many products match the facet filters (see database.PRODUCT_FACETS)"""
+        with self._lock:
+            bounds = self._bounds(filters)
+            if not bounds:
+                return len(self.ids)
+            # One pass per filtered column, each over the rows the previous one kept
+            column, low, high = bounds[0]
+            positions = [pos for pos, value in enumerate(column) if low <= value <= high]
+            for column, low, high in bounds[1:]:
+                positions = [pos for pos in positions if low <= column[pos] <= high]
+            return len(positions)
+
+    def query(self, filters=None, sort="id", descending=False, after=None, limit=None):
+        """Same rows as database.query_products, from memory"""
+        with self._lock:
+            match = self._matcher(filters)
+            order, key, row_key = self._order(sort)
+            # Descending pages walk the ascending order backwards, which also reverses the id tie-break like SQL
+            if descending:
+                end = len(order) if after is None else bisect.bisect_left(order, row_key(after), key=key)
+                indexes = range(end - 1, -1, -1)
+            else:
+                begin = 0 if after is None else bisect.bisect_right(order, row_key(after), key=key)
+                indexes = range(begin, len(order))
+            rows = []
+            for pos in map(order.__getitem__, indexes):
+                if limit is not None and len(rows) >= limit:
+                    break
+                if match is None or match(pos):
+                    rows.append(ProductRow(self, pos).as_product())
+            return rows
+
+    def search(self, query, limit=database.SEARCH_LIMIT, filters=None):
+        """Products whose name or category contains every word of the query, anywhere.
+
+        A fallback for text the FTS5 prefix index cannot find, such as the
+        middle of a word. Queries with price or quantity filters are left
+        to SQL and return no rows here.
+        """
+        match_expr, where, _ = database.parse_search(query)
+        terms = [term.lower() for term in match_expr.replace('"', " ").replace("*", " ").split()]
+        if where or not terms:
+            return []
+        with self._lock:
+            match = self._matcher(filters)
+            text, starts = self._search_index()
+            # Scan for the longest word with str.find, then check the others row by row
+            first = max(terms, key=len)
+            rows = []
+            at = text.find(first)
+            while at != -1 and len(rows) < limit:
+                pos = bisect.bisect_right(starts, at) - 1
+                row_text = text[starts[pos]:starts[pos + 1]]
+                if all(term in row_text for term in terms) and (match is None or match(pos)):
+                    rows.append(ProductRow(self, pos).as_product())
+                at = text.find(first, starts[pos + 1])
+            return rows
+
+    def memory_bytes(self):
+        """Approximate bytes held by the cached rows (not counting sort orders or the search text)"""
+        with self._lock:
+            size = sum(sys.getsizeof(column) for column in (self.ids, self.prices, self.quantities, self.category_ids))
+            size += sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in self.names)
+            size += sys.getsizeof(self.categories) + sum(sys.getsizeof(name) for name in self.categories.values())
+            return size
+
+    # --- Helpers (called with the lock held) ---
+    def _bounds(self, filters):
+        """The facet filters as (column, low, high) ranges, one per filtered column"""
+        ranges = {}
+        for name, value in (filters or {}).items():
+            if value is None or value == "":
+                continue
+            if name not in database.PRODUCT_FACETS:
+                raise ValueError(f"Unknown filter: {name}")
+            try:
+                value = database.PRODUCT_FACETS[name][1](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}.")
+            if name == "category":
+                wanted = next((cid for cid, cname in self.categories.items() if cname == value), 0)
+                column, low, high = "category", wanted, wanted
+            else:
+                column = "price" if name.endswith("price") else "quantity"
+                low, high = (value, None) if name.startswith("min_") else (None, value)
+            bound = ranges.setdefault(column, [float("-inf"), float("inf")])
+            if low is not None:
+                bound[0] = max(bound[0], low)
+            if high is not None:
+                bound[1] = min(bound[1], high)
+        columns = {"category": self.category_ids, "price": self.prices, "quantity": self.quantities}
+        return [(columns[column], low, high) for column, (low, high) in ranges.items()]
+
+    def _matcher(self, filters):
+        """A predicate over row positions for the facet filters, or None to match everything"""
+        bounds = self._bounds(filters)
+        if not bounds:
+            return None
+        return lambda pos: all(low <= column[pos] <= high for column, low, high in bounds)
+
+    def _position_key(self, sort):
+        """Sort key of the row at a position, ending with its id like the SQL ORDER BY"""
+        ids, names, prices, quantities = self.ids, self.names, self.prices, self.quantities
+        if sort == "id":
+            return lambda pos: ids[pos]
+        if sort == "name":
+            return lambda pos: (names[pos], ids[pos])
+        if sort == "category":
+            return lambda pos: (self.categories.get(self.category_ids[pos], ""), names[pos], ids[pos])
+        if sort == "price":
+            return lambda pos: (prices[pos], ids[pos])
+        if sort == "quantity":
+            return lambda pos: (quantities[pos], ids[pos])
+        raise ValueError(f"Unknown sort column: {sort}")
+
+    def _order(self, sort):
+        """Row positions in ascending `sort` order (cached until the next change), with the sort key of a position and of a Product"""
+        key = self._position_key(sort)
+        row_keys = {
+            "id": lambda row: row[0],
+            "name": lambda row: (row[1].encode("utf-8"), row[0]),
+            "category": lambda row: (row[2], row[1].encode("utf-8"), row[0]),
+            "price": lambda row: (row[3], row[0]),
+            "quantity": lambda row: (row[4], row[0]),
+        }
+        if sort == "id":
+            # Rows are kept in id order already
+            return range(len(self.ids)), key, row_keys[sort]
+        order = self._orders.get(sort)
+        if order is None:
+            order = self._orders[sort] = array("l", sorted(range(len(self.ids)), key=key))
+        return order, key, row_keys[sort]
+
+    def _search_index(self):
+        """Folded, lower-cased "name category" of every row joined in one string, and where each row starts"""
+        if self._search_text is None:
+            parts, starts, offset = [], array("q"), 0
+            for name, category_id in zip(self.names, self.category_ids):
+                part = database.fold_text(f"{name.decode('utf-8')} {self.categories.get(category_id, '')}\n").lower()
+                starts.append(offset)
+                parts.append(part)
+                offset += len(part)
+            starts.append(offset)
+            self._search_text = ("".join(parts), starts)
+        return self._search_text
+
+
+class _Columns:
+    """Empty columns for a load to fill before they replace the cache's"""
+
+    __slots__ = ("ids", "prices", "quantities", "category_ids", "names")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.prices = array("d")
+        self.quantities = array("q")
+        self.category_ids = array("q")
+        self.names = []
+
+    def append(self, row):
+        product_id, name, category_id, price, quantity = row
+        self.ids.append(product_id)
+        self.names.append(name.encode("utf-8"))
+        self.category_ids.append(category_id)
+        self.prices.append(price)
+        self.quantities.append(quantity)
+
+
+def tuple_bytes(rows):
+    """Approximate bytes of a list of product row tuples, as fetchall() returns them"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+def main():
+    database.init_db()
+    cache = ProductCache()
+    started = time.perf_counter()
+    rows = cache.load()
+    seconds = time.perf_counter() - started
+    tuples = tuple_bytes(database.get_connection().execute(database.PRODUCT_SELECT).fetchall())
+    database.close_all()
+    if not rows:
+        print("No products")
+        return
+    cached = cache.memory_bytes()
+    per_100k = 100000 / rows / 1048576
+    print(f"Loaded {rows} products in {seconds:.2f}s")
+    print(f"Cache:  {cached / 1048576:.1f} MB ({cached * per_100k:.1f} MB per 100k rows)")
+    print(f"Tuples: {tuples / 1048576:.1f} MB ({tuples * per_100k:.1f} MB per 100k rows)")
+
+
+if __name__ == "__main__":
+    main()
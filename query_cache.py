@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read-through cache for small, frequently repeated read queries.
+
+The window asks for the same few things again and again: the category
+list for the table and the comboboxes, the department list, the inventory
+summary, the image reference of a product that was clicked before. Wrapped
+reads are answered from a size-bounded LRU of recent results. Each entry
+is tagged with the tables it read, and a write to any of those tables
+drops it: writes wrapped by the cache invalidate when they return, and
+the app invalidates the tables that other processes changed as the change
+watcher reports them. Hits, misses, evictions and invalidations are
+counted.
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 256
+
+
+class QueryCache:
+    """LRU of read results keyed by (query, arguments), each tagged with the tables it read"""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (query, args, kwargs) -> (result, tables)
+        self._generation = 0           # bumped by every invalidation
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reads(self, fn, tables, name=None):
+        """Wrap a read so calls with the same arguments share one result until `tables` change.
+
+        Cached results are returned to every caller as is; treat them as read-only.
+        """
+        name = name or fn.__name__
+        tables = frozenset(tables)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+                generation = self._generation
+            result = fn(*args, **kwargs)
+            with self._lock:
+                # A write that finished while fn ran may have made the result stale
+                if generation == self._generation:
+                    self._entries[key] = (result, tables)
+                    if len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return result
+        return wrapper
+
+    def writes(self, fn, tables):
+        """Wrap a write so it invalidates the cached reads of `tables` once it returns or fails"""
+        tables = tuple(tables)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.invalidate(*tables)
+        return wrapper
+
+    def invalidate(self, *tables):
+        """Drop every cached result that read one of `tables`"""
+        if not tables:
+            return
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, (_, read) in self._entries.items() if not read.isdisjoint(tables)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                f"{stats['entries']} cached, {stats['evictions']} evicted")
+
+
+def install(cache, module, reads=None, writes=None):
+    """Replace module.<name> by a cached read or an invalidating write.
+
+    `reads` and `writes` map function names to the tables they read or
+    write, e.g. install(cache, database, reads={"category_names": ("categories",)}).
+    """
+    for name, tables in (reads or {}).items():
+        setattr(module, name, cache.reads(getattr(module, name), tables, name=f"{module.__name__}.{name}"))
+    for name, tables in (writes or {}).items():
+        setattr(module, name, cache.writes(getattr(module, name), tables))
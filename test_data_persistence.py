@@ -7,6 +7,8 @@ Test script to verify data persistence in the مصراوي سات application
 import sqlite3
 import os
 
+import database
+
 def test_data_persistence():
     """Test if data is properly saved and can be retrieved"""
     
@@ -64,22 +66,24 @@ def add_test_data():
     print("=" * 50)
     
     try:
-        conn = sqlite3.connect("employees.db")
-        cursor = conn.cursor()
+        # Through database.py, so the schema is migrated and departments and
+        # categories are referenced by id like the app does
+        database.init_db()
         
-        # Add test employee
-        cursor.execute("INSERT INTO employees (name, email, department) VALUES (?, ?, ?)", 
-                      ("Test Employee", "test@example.com", "Test Department"))
+        # Add test employee (the department is created if needed)
+        try:
+            database.add_employee("Test Employee", "test@example.com", "Test Department")
+        except sqlite3.IntegrityError:
+            print("  Test employee already exists (emails are unique)")
         
         # Add test category
-        cursor.execute("INSERT INTO categories (name) VALUES (?)", ("Test Category",))
+        with database.transaction() as conn:
+            database.ensure_categories(conn, ["Test Category"])
         
         # Add test product
-        cursor.execute("INSERT INTO products (name, category, price, quantity) VALUES (?, ?, ?, ?)", 
-                      ("Test Product", "Test Category", 99.99, 10))
+        database.add_product("Test Product", "Test Category", 99.99, 10)
         
-        conn.commit()
-        conn.close()
+        database.close_all()
         
         print("✓ Test data added successfully!")
         return True
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Product image thumbnails.
+
+Thumbnails are generated once, when an image is stored, at the size the
+product popup shows them, so opening a product never has to decode and
+resize the original photo. Images stored before thumbnails existed can be
+backfilled in a process pool by running this script directly.
+"""
+
+import io
+import sys
+import time
+from collections import OrderedDict
+
+import database
+
+THUMB_SIZE = (300, 300)
+JPEG_QUALITY = 85
+# Images handed to the process pool per database round trip
+BACKFILL_BATCH = 64
+
+
+def make_thumbnail(source):
+    """Decode an image (bytes, path, file object or PIL image) and return the popup-sized thumbnail as PNG/JPEG bytes"""
+    from PIL import Image, ImageOps
+
+    if isinstance(source, Image.Image):
+        img = source
+    else:
+        # Phone photos are often stored sideways with an EXIF orientation tag
+        img = ImageOps.exif_transpose(Image.open(io.BytesIO(source) if isinstance(source, bytes) else source))
+    img = img.resize(THUMB_SIZE)
+    out = io.BytesIO()
+    if img.mode in ("RGBA", "LA", "P"):
+        img.save(out, format="PNG", optimize=True)
+    else:
+        img.convert("RGB").save(out, format="JPEG", quality=JPEG_QUALITY)
+    return out.getvalue()
+
+
+def _thumbnail_or_none(data):
+    try:
+        return make_thumbnail(data)
+    except Exception as e:
+        print(f"Cannot create thumbnail: {e}")
+        return None
+
+
+def backfill_thumbnails(workers=None, batch=BACKFILL_BATCH):
+    """Generate missing thumbnails in a process pool; returns how many were stored"""
+    # Imported here: multiprocessing is slow to import and the app never needs it
+    from concurrent.futures import ProcessPoolExecutor
+
+    hashes = database.missing_thumbnails()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(hashes), batch):
+            chunk = hashes[start:start + batch]
+            # Only one batch of originals is held in memory at a time
+            originals = [database.get_image_data(digest) for digest in chunk]
+            thumbs = pool.map(_thumbnail_or_none, originals)
+            pairs = [(digest, thumb) for digest, thumb in zip(chunk, thumbs) if thumb is not None]
+            database.set_thumbnails(pairs)
+            done += len(pairs)
+            print(f"Thumbnails: {min(start + batch, len(hashes))}/{len(hashes)}")
+    return done
+
+
+class PhotoCache:
+    """LRU cache of ready-to-display ImageTk photos, bounded by decoded size"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._photos = OrderedDict()  # key -> (photo, size in bytes)
+
+    def get(self, key):
+        entry = self._photos.get(key)
+        if entry is None:
+            return None
+        self._photos.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, photo):
+        # Tk keeps photos as 32-bit pixels
+        size = photo.width() * photo.height() * 4
+        if key in self._photos:
+            self.bytes -= self._photos.pop(key)[1]
+        self._photos[key] = (photo, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._photos) > 1:
+            _, (_, evicted) = self._photos.popitem(last=False)
+            self.bytes -= evicted
+
+
+def main():
+    database.init_db()
+    started = time.perf_counter()
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    done = backfill_thumbnails(workers)
+    print(f"✓ {done} thumbnail(s) generated in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
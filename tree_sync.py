@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental Treeview updates.
+
+TreeviewReconciler keeps a map from row id to Treeview item and applies
+only the inserts, updates and deletes needed to make the Treeview match a
+query result, so refreshing keeps selection and scroll position and a
+single add or delete touches a single row.
+"""
+
+import tkinter as tk
+
+
+class TreeviewReconciler:
+    """Mirror a list of rows (first column is the row id) into a Treeview"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.items = {}   # row id -> Treeview item id
+        self.values = {}  # row id -> row last written to the item
+
+    def _insert(self, row, index=tk.END):
+        row_id = row[0]
+        item = self.tree.insert("", index, iid=str(row_id), values=tuple(row))
+        self.items[row_id] = item
+        self.values[row_id] = tuple(row)
+
+    def upsert(self, row):
+        """Insert a row at the end, or update it in place if it is shown"""
+        row_id = row[0]
+        if row_id not in self.items:
+            self._insert(row)
+        elif self.values[row_id] != tuple(row):
+            self.tree.item(self.items[row_id], values=tuple(row))
+            self.values[row_id] = tuple(row)
+
+    def remove(self, row_id):
+        item = self.items.pop(row_id, None)
+        if item is not None:
+            del self.values[row_id]
+            if self.tree.exists(item):
+                self.tree.delete(item)
+
+    def remove_many(self, row_ids):
+        """Remove several rows with a single Treeview delete"""
+        items = [self.items.pop(row_id) for row_id in row_ids if row_id in self.items]
+        for row_id in row_ids:
+            self.values.pop(row_id, None)
+        items = [item for item in items if self.tree.exists(item)]
+        if items:
+            self.tree.delete(*items)
+
+    def clear(self):
+        if self.items:
+            self.tree.delete(*self.items.values())
+        self.items.clear()
+        self.values.clear()
+
+    def reconcile(self, rows):
+        """Make the Treeview show exactly `rows`, in order, with minimal changes"""
+        rows = [tuple(row) for row in rows]
+        wanted = {row[0] for row in rows}
+
+        stale = [row_id for row_id in self.items if row_id not in wanted]
+        if stale:
+            self.tree.delete(*(self.items[row_id] for row_id in stale))
+            for row_id in stale:
+                del self.items[row_id]
+                del self.values[row_id]
+
+        # Rows already shown only need moving if their relative order changed
+        kept_order = [self.items[row[0]] for row in rows if row[0] in self.items]
+        kept = set(kept_order)
+        needs_move = kept_order != [item for item in self.tree.get_children() if item in kept]
+        # New rows after the last kept one can be appended, which Tk does without an index walk
+        last_kept = max((i for i, row in enumerate(rows) if row[0] in self.items), default=-1)
+        for index, row in enumerate(rows):
+            row_id = row[0]
+            item = self.items.get(row_id)
+            if item is None:
+                self._insert(row, tk.END if index > last_kept else index)
+                continue
+            if self.values[row_id] != row:
+                self.tree.item(item, values=row)
+                self.values[row_id] = row
+            if needs_move:
+                self.tree.move(item, "", index)
+
+
+def _row_id(row):
+    return row[0]
+
+
+class VirtualTable:
+    """Keyset-paginated Treeview that loads more rows as the user scrolls.
+
+    `fetch_page(after, limit)` must return up to `limit` rows following
+    the cursor `after` (None for the first page). The cursor of a row is
+    its id unless `load` is given another `cursor` function, e.g. one that
+    returns the row itself for a sorted query. Only the first page is read
+    up front, so the initial render costs the same however large the table
+    is.
+
+    With `fetch_before(before, limit)`, which returns up to `limit` rows
+    preceding the cursor `before` in display order, the table keeps a
+    window of at most `max_rows` rows: rows far above the view are dropped
+    as the user scrolls down and read back when they scroll up again, and
+    a refresh re-reads only the rows around the view.
+
+    `run(job, on_done)` decides where fetches execute; pass a worker's
+    submit to keep them off the Tk thread. Results of a fetch that was
+    superseded by a newer load or refresh are dropped.
+    """
+
+    PAGE_SIZE = 200
+    # Load the next page once fewer than this many rows remain below the view
+    PREFETCH_ROWS = 50
+    MAX_ROWS = 5 * PAGE_SIZE
+
+    def __init__(self, tree, scrollbar, page_size=PAGE_SIZE, prefetch=PREFETCH_ROWS, max_rows=MAX_ROWS, run=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.max_rows = max_rows
+        self.rows = TreeviewReconciler(tree)
+        self.window = []  # rows shown, in display order
+        self.fetch_page = None
+        self.fetch_before = None
+        self.cursor = _row_id
+        self.after = None         # cursor of the last row shown
+        self.exhausted = True     # no rows below the window
+        self.start_after = None   # cursor of the row above the window
+        self.at_start = True      # no rows above the window
+        self._view = (0.0, 1.0, 0)  # last scroll fractions and the row count they refer to
+        self._pending = False
+        self._generation = 0
+        self.run = run or (lambda job, on_done: on_done(job()))
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def load(self, fetch_page, cursor=None, fetch_before=None):
+        """Switch to a new row source and show its first page"""
+        self.fetch_page = fetch_page
+        self.fetch_before = fetch_before
+        self.cursor = cursor or _row_id
+        self._reload(None, self.page_size)
+
+    def refresh(self):
+        """Re-read the rows around the view and apply only the differences"""
+        if self.fetch_page is None:
+            return
+        if self.fetch_before is None or not self.window:
+            self._reload(None, max(len(self.window), self.page_size))
+            return
+        top, bottom = self._visible()
+        begin = max(top - self.prefetch, 0)
+        if begin:
+            anchor, at_start = self.cursor(self.window[begin - 1]), False
+        else:
+            anchor, at_start = self.start_after, self.at_start
+        self._reload(anchor, max(bottom - begin + self.prefetch, self.page_size), at_start, top - begin)
+
+    def load_more(self):
+        if self.exhausted or self.fetch_page is None:
+            self._pending = False
+            return
+        generation, fetch_page, after = self._generation, self.fetch_page, self.after
+
+        def append(rows):
+            if generation != self._generation:
+                return
+            top = self._visible()[0]
+            for row in rows:
+                self.rows.upsert(row)
+            self.window.extend(tuple(row) for row in rows)
+            self._advance(rows, self.page_size)
+            if self.fetch_before is not None and len(self.window) > self.max_rows:
+                dropped = len(self.window) - self.max_rows
+                self.start_after, self.at_start = self.cursor(self.window[dropped - 1]), False
+                self.rows.remove_many([row[0] for row in self.window[:dropped]])
+                del self.window[:dropped]
+                self._scroll_to(top - dropped)
+            self._pending = False
+        self.run(lambda: fetch_page(after, self.page_size), append)
+
+    def load_before(self):
+        if self.at_start or self.fetch_before is None:
+            self._pending = False
+            return
+        if not self.window:
+            self._reload(None, self.page_size)
+            return
+        generation, fetch_before = self._generation, self.fetch_before
+        before, limit = self.cursor(self.window[0]), self.page_size
+
+        def prepend(rows):
+            if generation != self._generation:
+                return
+            rows = [tuple(row) for row in rows]
+            # The extra row read is only needed as the cursor above the new window
+            if len(rows) > limit:
+                self.start_after, self.at_start = self.cursor(rows[0]), False
+                rows = rows[1:]
+            else:
+                self.start_after, self.at_start = None, True
+            top = self._visible()[0]
+            for index, row in enumerate(rows):
+                if row[0] not in self.rows.items:
+                    self.rows._insert(row, index)
+            self.window[:0] = rows
+            if len(self.window) > self.max_rows:
+                self.rows.remove_many([row[0] for row in self.window[self.max_rows:]])
+                del self.window[self.max_rows:]
+                self.after, self.exhausted = self.cursor(self.window[-1]), False
+            self._scroll_to(top + len(rows))
+            self._pending = False
+        self.run(lambda: fetch_before(before, limit + 1), prepend)
+
+    def _reload(self, anchor, limit, at_start=True, top=0):
+        self._generation += 1
+        self._pending = True  # no paging until the rows are back
+        generation, fetch_page = self._generation, self.fetch_page
+
+        def apply(rows):
+            if generation != self._generation:
+                return
+            self.rows.reconcile(rows)
+            self.window = [tuple(row) for row in rows]
+            self.start_after, self.at_start = anchor, at_start
+            self.after = anchor
+            self._advance(rows, limit)
+            if anchor is not None:
+                self._scroll_to(top)
+            self._pending = False
+        self.run(lambda: fetch_page(anchor, limit), apply)
+
+    def upsert(self, row):
+        """Show a new or changed row if it falls inside the loaded range.
+
+        New rows are appended, which keeps id order; sorted or filtered
+        views should be refreshed instead.
+        """
+        row = tuple(row)
+        if row[0] in self.rows.items:
+            self.window = [row if shown[0] == row[0] else shown for shown in self.window]
+        elif self.exhausted:
+            self.window.append(row)
+            self.after = self.cursor(row)
+        else:
+            return
+        self.rows.upsert(row)
+
+    def remove(self, row_id):
+        self.remove_many([row_id])
+
+    def remove_many(self, row_ids):
+        gone = set(row_ids)
+        self.window = [row for row in self.window if row[0] not in gone]
+        self.rows.remove_many(row_ids)
+
+    def _advance(self, rows, limit):
+        if rows:
+            self.after = self.cursor(rows[-1])
+        self.exhausted = len(rows) < limit
+
+    def _visible(self):
+        """Indexes of the first and last rows in view, as of the last scroll report"""
+        first, last, count = self._view
+        return int(first * count), int(round(last * count))
+
+    def _scroll_to(self, index):
+        """Put the row at `index` back at the top after rows above it came or went"""
+        if self.window:
+            self.tree.yview_moveto(max(index, 0) / len(self.window))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._view = (float(first), float(last), len(self.window))
+        if self._pending:
+            return
+        if not self.exhausted and (1.0 - float(last)) * len(self.window) < self.prefetch:
+            self._pending = True
+            self.tree.after_idle(self.load_more)
+        elif not self.at_start and float(first) * len(self.window) < self.prefetch:
+            self._pending = True
+            self.tree.after_idle(self.load_before)